@@ -4,10 +4,9 @@ from dotenv import load_dotenv
 import discord
 from discord import app_commands
 from discord.ext import commands
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Set, Tuple
 import asyncio
 import logging
-import base64
 import io
 
 # Setup logging
@@ -17,6 +16,21 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Embed colours, resolved once instead of per message
+COLOR_BLUE = discord.Color.blue().value
+COLOR_YELLOW = discord.Color.yellow().value
+COLOR_RED = discord.Color.red().value
+
+# Discord accepts up to 10 embeds per message; queued embeds wait at most this long
+EMBEDS_PER_MESSAGE = 10
+EMBED_FLUSH_INTERVAL = 0.2
+# On shutdown, queued embeds get this long to be sent before the flushers are stopped
+EMBED_DRAIN_TIMEOUT = 10.0
+
+# Suffix of stored face embedding attachments; bumped whenever face preprocessing changes
+# so embeddings computed the old way are ignored and re-encoded from the image
+FACE_EMBEDDING_SUFFIX = ".v2.npy"
+
 class DatabaseBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
@@ -28,8 +42,22 @@ class DatabaseBot(commands.Bot):
             help_command=None  # Removing default help as we'll use slash commands
         )
         self.channel_cache: Dict[str, discord.TextChannel] = {}
+        self.embed_queues: Dict[str, asyncio.Queue] = {}
+        self.flusher_tasks = []
+        # Usernames and emails already in #authentication, read from history once
+        self.auth_usernames: Set[str] = set()
+        self.auth_emails: Set[str] = set()
+        # Username or email -> [(message id, password)], newest record first
+        self.auth_credentials: Dict[str, List[Tuple[str, str]]] = {}
+        self.auth_index_loaded = False
+        # Created on first use, inside the running loop (asyncio primitives bind to a loop before Python 3.10)
+        self.auth_index_lock: Optional[asyncio.Lock] = None
         
     async def setup_hook(self):
+        # Coalesce high-volume log/error embeds into batched messages
+        for channel_name in ('logs', 'errors'):
+            self.embed_queues[channel_name] = asyncio.Queue()
+            self.flusher_tasks.append(asyncio.create_task(self._embed_flusher(channel_name)))
         await self.add_cog(DatabaseCommands(self))
         # Sync commands with Discord
         logger.info("Syncing commands with Discord...")
@@ -49,94 +77,224 @@ class DatabaseBot(commands.Bot):
         
         raise ValueError(f"Channel {channel_name} not found")
 
+    async def close(self):
+        # Let the flushers send what is already queued before stopping them
+        if any(not task.done() for task in self.flusher_tasks):
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self.embed_queues.values())),
+                    timeout=EMBED_DRAIN_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                pending = sum(queue.qsize() for queue in self.embed_queues.values())
+                logger.error(f"Shutting down with {pending} log/error embeds still queued")
+        for task in self.flusher_tasks:
+            task.cancel()
+        await asyncio.gather(*self.flusher_tasks, return_exceptions=True)
+        self.flusher_tasks.clear()
+        self.embed_queues.clear()
+        await super().close()
+
+    async def _queue_embed(self, channel: discord.TextChannel, embed: discord.Embed):
+        """Queue an embed for batched delivery, sending directly if batching isn't running"""
+        queue = self.embed_queues.get(channel.name)
+        if queue is None:
+            await channel.send(embed=embed)
+            return
+        queue.put_nowait(embed)
+
+    async def _embed_flusher(self, channel_name: str):
+        """Send queued embeds in batches of up to EMBEDS_PER_MESSAGE"""
+        queue = self.embed_queues[channel_name]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + EMBED_FLUSH_INTERVAL
+            try:
+                while len(batch) < EMBEDS_PER_MESSAGE:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=max(deadline - loop.time(), 0)))
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                channel = await self.get_channel_by_name(channel_name)
+                try:
+                    await channel.send(embeds=batch)
+                except discord.HTTPException:
+                    # A batch can exceed the per-message embed size limit, fall back to one per message
+                    for embed in batch:
+                        try:
+                            await channel.send(embed=embed)
+                        except Exception as e:
+                            logger.error(f"Failed to send embed to #{channel_name}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} embeds to #{channel_name}: {str(e)}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
     async def send_log(self, level: str, message: str, source: str):
         """Send a log message to the logs channel"""
         channel = await self.get_channel_by_name('logs')
-        embed = discord.Embed(
-            title=f"Log Entry from {source}",
-            color=discord.Color.blue() if level == "INFO" else discord.Color.yellow()
-        )
-        embed.add_field(name="Level", value=level, inline=True)
-        embed.add_field(name="Source", value=source, inline=True)
-        embed.add_field(name="Message", value=message, inline=False)
-        embed.set_footer(text=f"Timestamp: {discord.utils.utcnow().isoformat()}")
-        await channel.send(embed=embed)
+        embed = discord.Embed.from_dict({
+            "title": f"Log Entry from {source}",
+            "color": COLOR_BLUE if level == "INFO" else COLOR_YELLOW,
+            "fields": [
+                {"name": "Level", "value": level, "inline": True},
+                {"name": "Source", "value": source, "inline": True},
+                {"name": "Message", "value": message, "inline": False},
+            ],
+            "footer": {"text": f"Timestamp: {discord.utils.utcnow().isoformat()}"},
+        })
+        await self._queue_embed(channel, embed)
 
     async def send_error(self, error_type: str, message: str, source: str, stack_trace: Optional[str] = None):
         """Send an error message to the errors channel"""
         channel = await self.get_channel_by_name('errors')
-        embed = discord.Embed(
-            title=f"Error Entry from {source}",
-            color=discord.Color.red()
-        )
-        embed.add_field(name="Error Type", value=error_type, inline=True)
-        embed.add_field(name="Source", value=source, inline=True)
-        embed.add_field(name="Message", value=message, inline=False)
+        fields = [
+            {"name": "Error Type", "value": error_type, "inline": True},
+            {"name": "Source", "value": source, "inline": True},
+            {"name": "Message", "value": message, "inline": False},
+        ]
         if stack_trace:
-            embed.add_field(name="Stack Trace", value=f"```{stack_trace}```", inline=False)
-        embed.set_footer(text=f"Timestamp: {discord.utils.utcnow().isoformat()}")
-        await channel.send(embed=embed)
+            fields.append({"name": "Stack Trace", "value": f"```{stack_trace}```", "inline": False})
+        embed = discord.Embed.from_dict({
+            "title": f"Error Entry from {source}",
+            "color": COLOR_RED,
+            "fields": fields,
+            "footer": {"text": f"Timestamp: {discord.utils.utcnow().isoformat()}"},
+        })
+        await self._queue_embed(channel, embed)
 
-    async def send_face_auth(self, user_id: str, image_data: str) -> str:
-        """Send a face authentication message to the face-auth channel"""
+    async def send_face_auth(self, user_id: str, image_bytes: bytes, embedding: Optional[bytes] = None) -> str:
+        """Send a face authentication message to the face-auth channel
+        Args:
+            user_id: user the face belongs to
+            image_bytes: encoded image file contents
+            embedding: optional serialized face embedding, attached as a .npy file
+        """
         channel = await self.get_channel_by_name('face-auth')
         
-        if not image_data:
+        if not image_bytes:
             raise ValueError("Image data is required for face authentication")
             
         try:
-            # Remove data URL prefix if present
-            if "data:image/png;base64," in image_data:
-                image_data = image_data.split("data:image/png;base64,")[1]
-            
-            try:
-                # Decode base64 to bytes
-                image_bytes = base64.b64decode(image_data)
-            except Exception as e:
-                raise ValueError(f"Invalid base64 image data: {str(e)}")
-            
-            # Create file object
-            file = discord.File(
+            # Create file objects, the image always comes first
+            files = [discord.File(
                 fp=io.BytesIO(image_bytes),
                 filename=f"face_auth_{user_id}.png"
-            )
+            )]
+            if embedding is not None:
+                files.append(discord.File(
+                    fp=io.BytesIO(embedding),
+                    filename=f"face_embedding_{user_id}{FACE_EMBEDDING_SUFFIX}"
+                ))
             
             # Send message with image and user_id in content
             message = await channel.send(
                 content=f"JARVIS_USER_ID: {user_id}",
-                file=file
+                files=files
             )
             return str(message.id)
         except Exception as e:
             logger.error(f"Error processing image: {str(e)}")
             raise ValueError(f"Failed to process image: {str(e)}")
 
+    async def load_auth_index(self):
+        """Index registered usernames and emails from the authentication channel once"""
+        if self.auth_index_lock is None:
+            self.auth_index_lock = asyncio.Lock()
+        async with self.auth_index_lock:
+            if self.auth_index_loaded:
+                return
+            channel = await self.get_channel_by_name('authentication')
+            async for message in channel.history(limit=None):
+                if message.embeds:
+                    username = email = password = None
+                    for field in message.embeds[0].fields:
+                        if field.name == "Username":
+                            username = field.value
+                        elif field.name == "Email":
+                            email = field.value
+                        elif field.name == "Password":
+                            password = field.value
+                    self._index_credentials(str(message.id), username, email, password, newest=False)
+            self.auth_index_loaded = True
+
+    def _index_credentials(self, message_id: str, username: Optional[str], email: Optional[str], password: Optional[str], newest: bool = True):
+        """Add one authentication record to the username/email indexes"""
+        if username is not None:
+            self.auth_usernames.add(username)
+        if email is not None:
+            self.auth_emails.add(email)
+        if not password:
+            return
+        for identifier in {username, email} - {None}:
+            records = self.auth_credentials.setdefault(identifier, [])
+            if newest:
+                records.insert(0, (message_id, password))
+            else:
+                records.append((message_id, password))
+
+    def clear_indexes(self):
+        """Forget indexed channel contents, e.g. after a reset; listeners get on_database_reset"""
+        self.auth_usernames.clear()
+        self.auth_emails.clear()
+        self.auth_credentials.clear()
+        self.auth_index_loaded = False
+        self.dispatch('database_reset')
+
     async def send_auth(self, username: str, email: str, password: str) -> str:
         """Send authentication details to authentication channel and return message ID"""
         channel = await self.get_channel_by_name('authentication')
         
         # Check for existing username or email
-        async for message in channel.history(limit=None):
-            if message.embeds:
-                embed = message.embeds[0]
-                for field in embed.fields:
-                    if field.name == "Username" and field.value == username:
-                        raise ValueError("Username already exists")
-                    if field.name == "Email" and field.value == email:
-                        raise ValueError("Email already exists")
+        await self.load_auth_index()
+        if username in self.auth_usernames:
+            raise ValueError("Username already exists")
+        if email in self.auth_emails:
+            raise ValueError("Email already exists")
+        # Reserve both before sending so concurrent registrations can't claim them too
+        self.auth_usernames.add(username)
+        self.auth_emails.add(email)
         
-        embed = discord.Embed(
-            title="New User Authentication",
-            color=discord.Color.blue()
-        )
-        embed.add_field(name="Username", value=username, inline=True)
-        embed.add_field(name="Email", value=email, inline=True)
-        embed.add_field(name="Password", value=password, inline=False)
-        embed.set_footer(text=f"Timestamp: {discord.utils.utcnow().isoformat()}")
+        embed = discord.Embed.from_dict({
+            "title": "New User Authentication",
+            "color": COLOR_BLUE,
+            "fields": [
+                {"name": "Username", "value": username, "inline": True},
+                {"name": "Email", "value": email, "inline": True},
+                {"name": "Password", "value": password, "inline": False},
+            ],
+            "footer": {"text": f"Timestamp: {discord.utils.utcnow().isoformat()}"},
+        })
         
-        message = await channel.send(embed=embed)
+        try:
+            message = await channel.send(embed=embed)
+        except BaseException:
+            self.auth_usernames.discard(username)
+            self.auth_emails.discard(email)
+            raise
+        self._index_credentials(str(message.id), username, email, password)
         return str(message.id)  # This will be the jarvis_user_id
 
+    async def delete_auth(self, message_id: str, username: str, email: str):
+        """Delete an authentication record and drop it from the indexes, e.g. to roll back a registration"""
+        await self.delete_message('authentication', message_id)
+        self.auth_usernames.discard(username)
+        self.auth_emails.discard(email)
+        for identifier in (username, email):
+            records = [record for record in self.auth_credentials.get(identifier, ()) if record[0] != message_id]
+            if records:
+                self.auth_credentials[identifier] = records
+            else:
+                self.auth_credentials.pop(identifier, None)
+
+    async def delete_message(self, channel_name: str, message_id: str):
+        """Delete a message by ID from the given channel"""
+        channel = await self.get_channel_by_name(channel_name)
+        await channel.get_partial_message(int(message_id)).delete()
+
     async def create_project_post(self, jarvis_user_id: str, name: str, description: str, status: str) -> str:
         """Create a post in projects forum channel"""
         channel = await self.get_channel_by_name('projects')
@@ -198,32 +356,11 @@ class DatabaseBot(commands.Bot):
             jarvis_user_id if credentials match, None otherwise
         """
         try:
-            channel = await self.get_channel_by_name('authentication')
-            if not channel:
-                logger.error("Authentication channel not found")
-                return None
-            
-            async for message in channel.history(limit=None):
-                if message.embeds:
-                    embed = message.embeds[0]
-                    stored_username = None
-                    stored_email = None
-                    stored_password = None
-                    
-                    # Extract stored credentials from embed fields
-                    for field in embed.fields:
-                        if field.name == "Username":
-                            stored_username = field.value
-                        elif field.name == "Email":
-                            stored_email = field.value
-                        elif field.name == "Password":
-                            stored_password = field.value
-                    
-                    # Check if credentials match
-                    if stored_password and stored_password == password:
-                        if identifier == stored_username or identifier == stored_email:
-                            return str(message.id)  # Return jarvis_user_id (message ID)
-            
+            await self.load_auth_index()
+            # Newest record first, as the channel history scan used to return
+            for message_id, stored_password in self.auth_credentials.get(identifier, ()):
+                if stored_password == password:
+                    return message_id  # Return jarvis_user_id (message ID)
             return None  # No matching credentials found
             
         except Exception as e:
@@ -384,6 +521,8 @@ Created channels:
                         await interaction.followup.send(f"❌ Missing permissions for channel: #{channel_name}", ephemeral=True)
                         continue
 
+            self.bot.clear_indexes()
+
             await interaction.followup.send("""
 ✅ Database reset completed successfully!
 Cleared channels:
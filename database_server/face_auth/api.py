@@ -1,15 +1,27 @@
 from flask import Flask, request, jsonify
 from deepface import DeepFace
+import tensorflow as tf
 import numpy as np
-import base64
-import io
-from PIL import Image
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module
+except ImportError:
+    import base64
 import os
 import json
 import cv2
 import logging
 from flask_cors import CORS  # Add CORS support
-import uuid
+import threading
+import hashlib
+import hmac
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from collections import OrderedDict
+
+try:
+    import faiss  # Optional: sub-linear gallery search for large deployments
+except ImportError:
+    faiss = None
 
 # Configure logging
 logging.basicConfig(
@@ -28,11 +40,340 @@ USERS_FILE = "users.json"
 # Create data directory if it doesn't exist
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# Load existing users if available
+# Face recognition settings
+MODEL_NAME = "VGG-Face"
+EMBEDDINGS_FILE = "embeddings.npy"  # Per-user file holding one embedding per stored face
+MATCH_THRESHOLD = 0.6  # Minimum cosine similarity for a login match
+ENCODE_BATCH_SIZE = 64  # Faces per forward pass when encoding many images
+HNSW_NEIGHBORS = 32  # Graph degree of the faiss HNSW index
+SQ_MIN_TRAIN = 1000  # Gallery size at startup from which the faiss index stores int8 codes
+QUERY_CACHE_SIZE = 1024  # Recent login frames whose embeddings are kept
+
+# Registrations are appended to a JSONL journal and folded into users.json periodically
+USERS_JOURNAL = "users.journal.jsonl"
+COMPACT_EVERY = 500  # Journal entries before users.json is rewritten
+
 users_db = {}
-if os.path.exists(os.path.join(DATA_DIR, USERS_FILE)):
-    with open(os.path.join(DATA_DIR, USERS_FILE), 'r') as f:
-        users_db = json.load(f)
+users_lock = threading.Lock()
+journal_entries = 0
+users_files_seen = None  # (mtime_ns, size) of users.json and the journal after our last read or write
+# Next image number per user, handed out before the face record reaches users_db
+next_face_numbers = {}
+
+password_hasher = PasswordHasher()
+
+def hash_new_user_password(username, password):
+    """Hash the password for a user about to be created; existing users keep theirs"""
+    return None if username in users_db else password_hasher.hash(password)
+
+def check_password(username, password):
+    """Verify a user's password, upgrading legacy plaintext entries to argon2 hashes"""
+    user = users_db[username]
+    password_hash = user.get('password_hash')
+    if password_hash is None:
+        if not hmac.compare_digest(user.get('password', '').encode(), password.encode()):
+            return False
+        with users_lock:
+            # Re-read first so compaction cannot drop another worker's registrations
+            reload_users_db_if_changed()
+            user = users_db.get(username, user)
+            user['password_hash'] = password_hasher.hash(password)
+            user.pop('password', None)
+            compact_users_db()
+        logger.info(f"Upgraded stored password for {username} to argon2")
+        return True
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def apply_face_record(record):
+    """Apply a journal record (username, password_hash, face_path) to users_db"""
+    username = record['username']
+    if username not in users_db:
+        users_db[username] = {'password_hash': record['password_hash'], 'face_paths': [], 'face_count': 0}
+    user = users_db[username]
+    # A crash between replacing users.json and truncating the journal replays records
+    # that are already in users.json; applying one twice must not add the face again
+    if record['face_path'] in user['face_paths']:
+        return
+    user['face_count'] = user.get('face_count', len(user['face_paths'])) + 1
+    user['face_paths'].append(record['face_path'])
+
+def users_files_state():
+    """Stat users.json and the journal so writes by other processes can be detected"""
+    state = []
+    for name in (USERS_FILE, USERS_JOURNAL):
+        try:
+            st = os.stat(os.path.join(DATA_DIR, name))
+            state.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            state.append(None)
+    return tuple(state)
+
+def compact_users_db():
+    """Rewrite users.json from memory and truncate the journal"""
+    global journal_entries, users_files_seen
+    users_path = os.path.join(DATA_DIR, USERS_FILE)
+    tmp_path = users_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(users_db, f, indent=4)
+    os.replace(tmp_path, users_path)
+    open(os.path.join(DATA_DIR, USERS_JOURNAL), 'w').close()
+    journal_entries = 0
+    users_files_seen = users_files_state()
+    logger.info(f"Compacted users database ({len(users_db)} users)")
+
+def record_faces(records):
+    """Add face records to users_db and append them to the journal in one write"""
+    global journal_entries, users_files_seen
+    with users_lock:
+        reloaded = reload_users_db_if_changed()
+        for record in records:
+            apply_face_record(record)
+        with open(os.path.join(DATA_DIR, USERS_JOURNAL), 'a') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+        journal_entries += len(records)
+        if journal_entries >= COMPACT_EVERY:
+            compact_users_db()
+        else:
+            users_files_seen = users_files_state()
+        if reloaded:
+            load_gallery()
+
+def read_users_files():
+    """Load users.json and replay any journal entries written since the last compaction"""
+    global journal_entries, users_files_seen
+    users_files_seen = users_files_state()
+    users_path = os.path.join(DATA_DIR, USERS_FILE)
+    if os.path.exists(users_path):
+        with open(users_path, 'r') as f:
+            users_db.update(json.load(f))
+    journal_path = os.path.join(DATA_DIR, USERS_JOURNAL)
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    apply_face_record(json.loads(line))
+                    journal_entries += 1
+                except (json.JSONDecodeError, KeyError):
+                    # A crash mid-append can leave a truncated last line
+                    logger.warning("Skipping malformed users journal entry")
+
+def reload_users_db_if_changed():
+    """Re-read the users files if another process has written them; call with users_lock held
+    Returns:
+        True if users_db was reloaded
+    """
+    global journal_entries
+    if users_files_state() == users_files_seen:
+        return False
+    users_db.clear()
+    next_face_numbers.clear()
+    journal_entries = 0
+    read_users_files()
+    return True
+
+def refresh_users_db():
+    """Pick up registrations made by other worker processes, at the cost of two stat calls"""
+    with users_lock:
+        if not reload_users_db_if_changed():
+            return
+        logger.info("Users files changed on disk, reloading face gallery")
+        load_gallery()
+
+read_users_files()
+if journal_entries:
+    compact_users_db()
+
+# Allocate GPU memory on demand instead of reserving it all up front
+for gpu in tf.config.list_physical_devices('GPU'):
+    tf.config.experimental.set_memory_growth(gpu, True)
+
+# Build the recognition model once at startup so requests never construct the graph
+FACE_MODEL = DeepFace.build_model(MODEL_NAME)
+
+# Gallery of L2-normalised embeddings for every stored face, with the owning username per row.
+# With faiss installed the vectors live in FACE_INDEX, otherwise in the EMBEDDINGS matrix.
+EMBEDDINGS = None
+FACE_INDEX = None
+LABELS = []
+gallery_lock = threading.Lock()
+
+def encode_batch(images):
+    """Compute L2-normalised face embeddings for a list of BGR images in one forward pass
+    Returns:
+        (N, D) float32 array, one row per input image
+    """
+    height, width = FACE_MODEL.input_shape
+    faces = []
+    for img in images:
+        # Detect and align the face; crops come back as RGB floats in [0, 1]
+        face = DeepFace.extract_faces(img_path=img, enforce_detection=False, align=True)[0]['face']
+        faces.append(cv2.resize(face[:, :, ::-1], (width, height)))
+    batch = np.stack(faces).astype(np.float32)
+    embeddings = FACE_MODEL.model.predict(batch, batch_size=ENCODE_BATCH_SIZE, verbose=0).astype(np.float32)
+    return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+
+def encode_face(img):
+    """Compute the L2-normalised face embedding of a BGR image"""
+    return encode_batch([img])[0]
+
+# LRU of login embeddings keyed by a digest of the decoded pixels, so retried frames skip the CNN
+query_cache = OrderedDict()
+query_cache_lock = threading.Lock()
+
+def encode_query(img):
+    """Encode a login image, reusing the embedding of an identical recent frame"""
+    key = hashlib.blake2b(img.tobytes(), digest_size=16).digest() + repr(img.shape).encode()
+    with query_cache_lock:
+        embedding = query_cache.get(key)
+        if embedding is not None:
+            query_cache.move_to_end(key)
+            return embedding
+    embedding = encode_face(img)
+    with query_cache_lock:
+        query_cache[key] = embedding
+        if len(query_cache) > QUERY_CACHE_SIZE:
+            query_cache.popitem(last=False)
+    return embedding
+
+def save_user_embeddings(username, embeddings):
+    """Append embedding rows to the user's embeddings file"""
+    path = os.path.join(DATA_DIR, username, EMBEDDINGS_FILE)
+    if os.path.exists(path):
+        embeddings = np.vstack([np.load(path), embeddings])
+    np.save(path, embeddings)
+
+def build_face_index(embeddings):
+    """Create the faiss index for the gallery
+    Large galleries get an int8 scalar-quantised index trained on the initial embeddings,
+    cutting memory traffic per search 4x; small ones stay exact since they are cheap anyway.
+    """
+    dim = embeddings.shape[1]
+    if len(embeddings) >= SQ_MIN_TRAIN:
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        logger.info(f"Built int8 quantised face index from {len(embeddings)} embeddings")
+        return index
+    return faiss.IndexHNSWFlat(dim, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+
+def add_to_gallery(usernames, embeddings):
+    """Add embedding rows to the in-memory gallery"""
+    global EMBEDDINGS, FACE_INDEX, LABELS
+    with gallery_lock:
+        if faiss is not None:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            if FACE_INDEX is None:
+                # Inner product on unit vectors is cosine similarity
+                FACE_INDEX = build_face_index(embeddings)
+            FACE_INDEX.add(embeddings)
+        else:
+            EMBEDDINGS = embeddings if EMBEDDINGS is None else np.vstack([EMBEDDINGS, embeddings])
+        LABELS = LABELS + list(usernames)
+
+def replace_gallery(usernames, embeddings):
+    """Swap in a freshly loaded gallery without leaving it empty while it is built"""
+    global EMBEDDINGS, FACE_INDEX, LABELS
+    index = None
+    if faiss is not None and embeddings is not None:
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        index = build_face_index(embeddings)
+        index.add(embeddings)
+    with gallery_lock:
+        EMBEDDINGS = None if faiss is not None else embeddings
+        FACE_INDEX = index
+        LABELS = list(usernames)
+
+def load_gallery():
+    """Load stored embeddings for all users, batch-encoding faces that have none yet"""
+    gallery_labels, gallery_embeddings = [], []
+    pending_users = []  # (username, number of images) in the order they were queued
+    pending_images = []
+    for username, user_data in users_db.items():
+        path = os.path.join(DATA_DIR, username, EMBEDDINGS_FILE)
+        if os.path.exists(path):
+            embeddings = np.load(path)
+            gallery_labels.extend([username] * len(embeddings))
+            gallery_embeddings.append(embeddings)
+            continue
+        images = []
+        for face_path in user_data.get('face_paths', []):
+            img = cv2.imread(face_path)
+            if img is None:
+                logger.warning(f"Face image not found: {face_path}")
+                continue
+            images.append(img)
+        if images:
+            pending_users.append((username, len(images)))
+            pending_images.extend(images)
+
+    if pending_images:
+        logger.info(f"Encoding {len(pending_images)} stored face images")
+        embeddings = encode_batch(pending_images)
+        offset = 0
+        for username, count in pending_users:
+            user_embeddings = embeddings[offset:offset + count]
+            offset += count
+            np.save(os.path.join(DATA_DIR, username, EMBEDDINGS_FILE), user_embeddings)
+            gallery_labels.extend([username] * count)
+            gallery_embeddings.append(user_embeddings)
+
+    # Build the whole gallery at once so a quantised index is trained on every stored face
+    replace_gallery(gallery_labels, np.vstack(gallery_embeddings) if gallery_embeddings else None)
+    logger.info(f"Loaded {len(LABELS)} face embeddings for {len(users_db)} users")
+
+def match_face(img):
+    """Find the best matching user for a face image
+    Returns:
+        (username, similarity), username is None when the gallery is empty
+    """
+    query = encode_query(img)
+    with gallery_lock:
+        if not LABELS:
+            return None, 0.0
+        if FACE_INDEX is not None:
+            # faiss indexes must not be searched while another thread adds to them
+            scores, ids = FACE_INDEX.search(query[np.newaxis, :], 1)
+            return LABELS[int(ids[0, 0])], float(scores[0, 0])
+        embeddings, labels = EMBEDDINGS, LABELS
+    # Cosine similarity against every stored face in one matrix-vector product
+    scores = embeddings @ query
+    best = int(scores.argmax())
+    return labels[best], float(scores[best])
+
+def warmup_model():
+    """Run a dummy forward pass so graph tracing and kernel autotuning happen before the first request"""
+    encode_face(np.zeros((224, 224, 3), dtype=np.uint8))
+    logger.info(f"{MODEL_NAME} model loaded and warmed up")
+
+warmup_model()
+load_gallery()
+
+def bytes_to_image(img_data):
+    """Decode encoded image bytes straight to a BGR OpenCV image"""
+    img = cv2.imdecode(np.frombuffer(img_data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Failed to decode image")
+    return img
+
+def get_request_data():
+    """Return the request fields from a multipart form or a JSON body"""
+    return request.form if request.files else request.get_json()
+
+def has_request_image(data, field):
+    """Check whether an image was sent in the given field"""
+    return field in request.files or bool(data.get(field))
+
+def get_request_image(data, field):
+    """Decode an image sent as a multipart file, or as base64 in the JSON body"""
+    upload = request.files.get(field)
+    if upload is not None:
+        return bytes_to_image(upload.read())
+    return base64_to_image(data[field])
 
 def base64_to_image(base64_string):
     try:
@@ -43,31 +384,48 @@ def base64_to_image(base64_string):
         # Decode base64 string to bytes
         img_data = base64.b64decode(base64_string)
         
-        # Convert to PIL Image
-        img = Image.open(io.BytesIO(img_data))
-        
-        # Convert to RGB if necessary
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Convert to OpenCV format
-        return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+        return bytes_to_image(img_data)
     except Exception as e:
         logger.error(f"Error converting base64 to image: {str(e)}")
         raise e
 
+def reserve_face_number(username):
+    """Return the next image number for a user from the stored face_count"""
+    with users_lock:
+        number = next_face_numbers.get(username)
+        if number is None:
+            user = users_db.get(username)
+            number = user.get('face_count', len(user['face_paths'])) + 1 if user else 1
+        next_face_numbers[username] = number + 1
+    return number
+
+def save_face_image(username, image):
+    """Store a face image in the user's directory and return its path"""
+    # Create user directory
+    user_dir = os.path.join(DATA_DIR, username)
+    os.makedirs(user_dir, exist_ok=True)
+    
+    image_path = os.path.join(user_dir, f'face_{reserve_face_number(username)}.jpg')
+    
+    # Save image
+    cv2.imwrite(image_path, image)
+    logger.info(f"Saved face image: {image_path}")
+    return image_path
+
 @app.route('/register', methods=['POST'])
 def register():
     logger.info("Starting registration process")
     try:
-        data = request.get_json()
+        data = get_request_data()
         logger.debug(f"Received data: {data}")  # Log the received data
 
         if not data:
-            logger.error("No JSON data received")
+            logger.error("No data received")
             return jsonify({'error': 'No data received'}), 400
 
-        if 'username' not in data or 'password' not in data or 'image' not in data:
+        # Several angles can be uploaded together as repeated 'images' files
+        uploads = request.files.getlist('images')
+        if 'username' not in data or 'password' not in data or not (uploads or has_request_image(data, 'image')):
             logger.error("Missing username, password, or image in request")
             return jsonify({'error': 'Missing username, password, or image'}), 400
 
@@ -75,113 +433,125 @@ def register():
         password = data['password']
         logger.debug(f"Processing registration for username: {username}")
 
-        # Convert base64 to image
+        # Decode uploaded or base64 image(s)
         try:
-            image = base64_to_image(data['image'])
-            logger.info("Successfully decoded image")
+            if uploads:
+                images = [bytes_to_image(upload.read()) for upload in uploads]
+            else:
+                images = [get_request_image(data, 'image')]
+            logger.info(f"Successfully decoded {len(images)} image(s)")
         except Exception as e:
             logger.error(f"Failed to decode image: {str(e)}")
             return jsonify({'error': 'Invalid image data'}), 400
         
-        # Create user directory
-        user_dir = os.path.join(DATA_DIR, username)
-        os.makedirs(user_dir, exist_ok=True)
-        
-        # Get number of existing images for this user
-        existing_images = len(os.listdir(user_dir))
-        image_path = os.path.join(user_dir, f'face_{existing_images + 1}.jpg')
-        
-        # Save image
-        cv2.imwrite(image_path, image)
-        logger.info(f"Saved face image: {image_path}")
+        # Encode the faces once so logins only compare embeddings
+        embeddings = encode_batch(images)
+        password_hash = hash_new_user_password(username, password)
+        records = []
+        for image in images:
+            records.append({
+                'username': username,
+                'password_hash': password_hash,
+                'face_path': save_face_image(username, image)
+            })
+        save_user_embeddings(username, embeddings)
+        add_to_gallery([username] * len(images), embeddings)
         
         # Update users database
-        if username not in users_db:
-            users_db[username] = {'password': password, 'face_paths': []}
-        users_db[username]['face_paths'].append(image_path)
-        
-        # Save updated users database
-        with open(os.path.join(DATA_DIR, USERS_FILE), 'w') as f:
-            json.dump(users_db, f, indent=4)
+        record_faces(records)
         
         logger.info(f"Registration successful for user: {username}")
         return jsonify({
             'message': 'Registration successful',
-            'face_count': len(users_db[username]['face_paths'])
+            'face_count': users_db[username]['face_count']
         }), 200
         
     except Exception as e:
         logger.error(f"Registration error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/register_bulk', methods=['POST'])
+def register_bulk():
+    """Register many users/faces at once, encoding all images in a single batch"""
+    logger.info("Starting bulk registration")
+    try:
+        data = request.get_json()
+        entries = data.get('users') if data else None
+        if not entries:
+            logger.error("No users received for bulk registration")
+            return jsonify({'error': 'A non-empty users list is required'}), 400
+
+        usernames, images = [], []
+        for index, entry in enumerate(entries):
+            if 'username' not in entry or 'password' not in entry or 'image' not in entry:
+                logger.error(f"Bulk entry {index} is missing username, password, or image")
+                return jsonify({'error': f'Entry {index} is missing username, password, or image'}), 400
+            try:
+                images.append(base64_to_image(entry['image']))
+            except Exception as e:
+                logger.error(f"Failed to decode image for entry {index}: {str(e)}")
+                return jsonify({'error': f'Invalid image data in entry {index}'}), 400
+            usernames.append(entry['username'])
+
+        embeddings = encode_batch(images)
+
+        records = []
+        password_hashes = {}
+        for entry, image, embedding in zip(entries, images, embeddings):
+            username = entry['username']
+            image_path = save_face_image(username, image)
+            save_user_embeddings(username, embedding[np.newaxis, :])
+            # Hash once per new user rather than once per image
+            if username not in password_hashes:
+                password_hashes[username] = hash_new_user_password(username, entry['password'])
+            records.append({'username': username, 'password_hash': password_hashes[username], 'face_path': image_path})
+        add_to_gallery(usernames, embeddings)
+
+        # Journal the whole batch in a single append
+        record_faces(records)
+
+        logger.info(f"Bulk registration stored {len(images)} faces for {len(set(usernames))} users")
+        return jsonify({
+            'message': 'Bulk registration successful',
+            'registered': len(images)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Bulk registration error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/login', methods=['POST'])
 def login():
     logger.info("Starting login process")
     try:
-        data = request.get_json()
+        data = get_request_data()
         logger.debug(f"Received login data: {data}")
 
-        if not data or 'image' not in data:
+        if data is None or not has_request_image(data, 'image'):
             logger.error("Missing image data for login")
             return jsonify({'error': 'Image data is required for login'}), 400
 
-        face_image = data['image']
         logger.debug("Processing face verification")
 
-        # Convert base64 to image
+        # Decode uploaded or base64 image
         try:
-            img = base64_to_image(face_image)
+            img = get_request_image(data, 'image')
             logger.info("Successfully decoded login image")
         except Exception as e:
             logger.error(f"Failed to decode login image: {str(e)}")
             return jsonify({'error': 'Invalid image data'}), 400
 
-        # Save temporary image for face recognition
-        temp_path = os.path.join(DATA_DIR, f"temp_{uuid.uuid4().hex}.jpg")
-        cv2.imwrite(temp_path, img)
-        logger.info(f"Saved temporary login image to: {temp_path}")
-
         try:
-            # Perform face verification against all users
-            matches = []
-            for username, user_data in users_db.items():
-                for face_path in user_data.get('face_paths', []):
-                    if not os.path.exists(face_path):
-                        logger.warning(f"Face image not found: {face_path}")
-                        continue
-                    try:
-                        result = DeepFace.verify(
-                            img1_path=temp_path,
-                            img2_path=face_path,
-                            enforce_detection=False,
-                            model_name="VGG-Face"
-                        )
-                        
-                        if result['verified']:
-                            similarity = 1 - result['distance']
-                            matches.append((username, similarity))
-                            logger.info(f"Match found for {username} with similarity {similarity:.2%}")
-                    except Exception as e:
-                        logger.error(f"Error comparing faces: {str(e)}")
-                        continue
+            refresh_users_db()
+            best_match, highest_similarity = match_face(img)
             
-            # Cleanup temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                logger.info(f"Removed temporary file: {temp_path}")
-            
-            if matches:
-                # Sort matches by similarity
-                matches.sort(key=lambda x: x[1], reverse=True)
-                best_match, highest_similarity = matches[0]
-                
-                if highest_similarity > 0.6:
-                    logger.info(f"Login successful for {best_match} with confidence {highest_similarity:.2%}")
-                    return jsonify({
-                        'message': 'Login successful',
-                        'username': best_match,
-                        'confidence': f'{highest_similarity:.2%}'
-                    }), 200
+            if best_match and highest_similarity > MATCH_THRESHOLD:
+                logger.info(f"Login successful for {best_match} with confidence {highest_similarity:.2%}")
+                return jsonify({
+                    'message': 'Login successful',
+                    'username': best_match,
+                    'confidence': f'{highest_similarity:.2%}'
+                }), 200
             
             logger.warning("No face match found with sufficient confidence")
             return jsonify({'error': 'Face not recognized or confidence too low'}), 401
@@ -205,20 +575,14 @@ def traditional_login():
             logger.error("Username and password are required for traditional login")
             return jsonify({'error': 'Username and password are required.'}), 400
 
-        users_file = os.path.join(DATA_DIR, 'users.json')
-        if os.path.exists(users_file):
-            with open(users_file, 'r') as f:
-                users = json.load(f)
-        else:
-            users = {}
-
-        user = users.get(username)
+        # Serve from memory; only a stat() per request checks for other workers' writes
+        refresh_users_db()
+        user = users_db.get(username)
         if not user:
             logger.error(f"Traditional login failed: User {username} does not exist")
             return jsonify({'error': 'User does not exist.'}), 401
 
-        # In production, use hashed passwords!
-        if user.get('password') != password:
+        if not check_password(username, password):
             logger.error(f"Traditional login failed: Incorrect password for user {username}")
             return jsonify({'error': 'Incorrect password.'}), 401
 
@@ -243,7 +607,7 @@ def auth():
 
     try:
         logger.info("Received auth request")
-        data = request.get_json()
+        data = get_request_data()
         
         if not data:
             return jsonify({'error': 'No data received'}), 400
@@ -252,79 +616,28 @@ def auth():
         logger.info(f"Auth mode: {mode}")
         
         if mode == 'login':
-            face_image = data.get('faceImage')
-            if not face_image:
+            if not has_request_image(data, 'faceImage'):
                 return jsonify({'error': 'Face image is required'}), 400
                 
-            # Convert base64 to image
+            # Decode uploaded or base64 image
             try:
-                img = base64_to_image(face_image)
+                img = get_request_image(data, 'faceImage')
                 logger.info("Successfully decoded login image")
             except Exception as e:
                 logger.error(f"Failed to decode login image: {str(e)}")
                 return jsonify({'error': 'Invalid image data'}), 400
 
-            # Create temporary directory for login attempt
-            temp_dir = os.path.join(DATA_DIR, f"temp_{uuid.uuid4().hex}")
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_path = os.path.join(temp_dir, "temp.jpg")
-            cv2.imwrite(temp_path, img)
-            
             try:
-                # Load users database
-                users_file = os.path.join(DATA_DIR, USERS_FILE)
-                if os.path.exists(users_file):
-                    with open(users_file, 'r') as f:
-                        users_db = json.load(f)
-                else:
-                    users_db = {}
-                
-                # Perform face verification against all users
-                matches = []
-                for username, user_data in users_db.items():
-                    face_paths = user_data.get('face_paths', [])
-                    if not face_paths:
-                        continue
-                        
-                    for face_path in face_paths:
-                        if not os.path.exists(face_path):
-                            logger.warning(f"Face image not found: {face_path}")
-                            continue
-                            
-                        try:
-                            result = DeepFace.verify(
-                                img1_path=temp_path,
-                                img2_path=face_path,
-                                enforce_detection=False,
-                                model_name="VGG-Face"
-                            )
-                            
-                            if result['verified']:
-                                similarity = 1 - result['distance']
-                                matches.append((username, similarity))
-                                logger.info(f"Match found for {username} with similarity {similarity:.2%}")
-                                
-                        except Exception as e:
-                            logger.error(f"Error comparing faces: {str(e)}")
-                            continue
+                refresh_users_db()
+                best_match, highest_similarity = match_face(img)
                 
-                # Cleanup
-                import shutil
-                if os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
-                    logger.info(f"Cleaned up temporary directory: {temp_dir}")
-                
-                if matches:
-                    matches.sort(key=lambda x: x[1], reverse=True)
-                    best_match, highest_similarity = matches[0]
-                    
-                    if highest_similarity > 0.6:
-                        logger.info(f"Login successful for {best_match} with confidence {highest_similarity:.2%}")
-                        return jsonify({
-                            'message': 'Login successful',
-                            'username': best_match,
-                            'confidence': f'{highest_similarity:.2%}'
-                        }), 200
+                if best_match and highest_similarity > MATCH_THRESHOLD:
+                    logger.info(f"Login successful for {best_match} with confidence {highest_similarity:.2%}")
+                    return jsonify({
+                        'message': 'Login successful',
+                        'username': best_match,
+                        'confidence': f'{highest_similarity:.2%}'
+                    }), 200
                 
                 logger.warning("No face match found with sufficient confidence")
                 return jsonify({'error': 'Face not recognized'}), 401
@@ -341,4 +654,5 @@ def auth():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # Development only; use wsgi.py under gunicorn in production
+    app.run(host='0.0.0.0', port=5001)
@@ -7,10 +7,10 @@ import logging
 import os
 import json
 from deepface import DeepFace
-import uuid
 import logging.handlers
 from werkzeug.serving import WSGIRequestHandler
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils import setup_server
 
 WSGIRequestHandler.triggered_reload = lambda self: None
@@ -68,6 +68,31 @@ logger = logging.getLogger(__name__)
 # Initialize data and server managers
 data_manager, server_manager = setup_server()
 
+# Stored faces are compared in parallel; TensorFlow releases the GIL during inference
+verify_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+EARLY_MATCH_DISTANCE = 0.1  # Stop comparing once a match is at least 90% similar
+
+def verify_face(face_img, username, face_path):
+    """Compare a face crop with one stored face image
+    Returns:
+        (username, DeepFace result), the result is None if the comparison failed
+    """
+    try:
+        logger.info(f"Attempting face verification with: {face_path}")
+        # Pass the face crop in memory rather than via a temp file
+        result = DeepFace.verify(
+            img1_path=face_img,
+            img2_path=face_path,
+            enforce_detection=False,
+            model_name="VGG-Face",
+            distance_metric="cosine"
+        )
+        logger.info(f"Verification result: {result}")
+        return username, result
+    except Exception as e:
+        logger.error(f"Face comparison error with {face_path}: {str(e)}")
+        return username, None
+
 @app.route('/auth', methods=['POST'])
 def auth():
     try:
@@ -241,80 +266,55 @@ def auth():
                     
                     face_img = img[start_y:end_y, start_x:end_x]
 
-                    # Create a unique directory for this login attempt
-                    login_attempt_dir = os.path.join(data_manager.data_dir, f"login_attempt_{uuid.uuid4().hex}")
-                    os.makedirs(login_attempt_dir, exist_ok=True)
-                    
-                    # Save temporary image
-                    temp_path = os.path.join(login_attempt_dir, "temp.jpg")
-                    if not cv2.imwrite(temp_path, face_img):  # Save the face region instead of full image
-                        raise ValueError("Failed to save temporary image")
-                    
-                    logger.info(f"Temporary image saved at: {temp_path}")
-
+                    # Use data_manager.users_cache instead of reading file directly
+                    users = data_manager.users_cache
+
+                    # Compare against every stored face in parallel
+                    pairs = []
+                    for username, user_data in users.items():
+                        logger.info(f"Comparing with user: {username}")
+                        for face_path in user_data.get('face_paths', []):
+                            if not os.path.exists(face_path):
+                                logger.warning(f"Stored face image not found: {face_path}")
+                                continue
+                            pairs.append((username, face_path))
+
+                    futures = [verify_executor.submit(verify_face, face_img, username, face_path)
+                               for username, face_path in pairs]
+                    matches = []
                     try:
-                        # Use data_manager.users_cache instead of reading file directly
-                        users = data_manager.users_cache
-
-                        # Try to find matching face
-                        matches = []
-                        for username, user_data in users.items():
-                            logger.info(f"Comparing with user: {username}")
-                            face_paths = user_data.get('face_paths', [])
-                            
-                            for face_path in face_paths:
-                                if not os.path.exists(face_path):
-                                    logger.warning(f"Stored face image not found: {face_path}")
-                                    continue
-
-                                try:
-                                    logger.info(f"Attempting face verification with: {face_path}")
-                                    result = DeepFace.verify(
-                                        img1_path=temp_path,
-                                        img2_path=face_path,
-                                        enforce_detection=False,
-                                        model_name="VGG-Face",
-                                        distance_metric="cosine"
-                                    )
-                                    
-                                    logger.info(f"Verification result: {result}")
-                                    
-                                    if result.get('verified', False):
-                                        matches.append((username, result.get('distance', 1.0)))
-                                        logger.info(f"Match found: {username} with distance {result.get('distance', 1.0)}")
-
-                                except Exception as e:
-                                    logger.error(f"Face comparison error with {face_path}: {str(e)}")
-                                    continue
-
-                        # Process results
-                        if matches:
-                            # Sort by confidence (lower distance is better)
-                            matches.sort(key=lambda x: x[1])
-                            best_match, best_distance = matches[0]
-                            
-                            logger.info(f"Best match: {best_match} with distance {best_distance}")
-                            return jsonify({
-                                'success': True,
-                                'message': 'Login successful',
-                                'username': best_match,
-                                'confidence': f"{(1 - best_distance) * 100:.2f}%"
-                            }), 200
-                        else:
-                            logger.warning("No matching faces found")
-                            return jsonify({
-                                'success': False,
-                                'error': 'Face not recognized'
-                            }), 401
-
+                        for future in as_completed(futures):
+                            username, result = future.result()
+                            if result and result.get('verified', False):
+                                distance = result.get('distance', 1.0)
+                                matches.append((username, distance))
+                                logger.info(f"Match found: {username} with distance {distance}")
+                                if distance <= EARLY_MATCH_DISTANCE:
+                                    break
                     finally:
-                        # Clean up
-                        try:
-                            import shutil
-                            shutil.rmtree(login_attempt_dir)
-                            logger.info(f"Cleaned up login attempt directory: {login_attempt_dir}")
-                        except Exception as e:
-                            logger.error(f"Error cleaning up temporary files: {str(e)}")
+                        # Drop comparisons that have not started once the outcome is known
+                        for future in futures:
+                            future.cancel()
+
+                    # Process results
+                    if matches:
+                        # Sort by confidence (lower distance is better)
+                        matches.sort(key=lambda x: x[1])
+                        best_match, best_distance = matches[0]
+                        
+                        logger.info(f"Best match: {best_match} with distance {best_distance}")
+                        return jsonify({
+                            'success': True,
+                            'message': 'Login successful',
+                            'username': best_match,
+                            'confidence': f"{(1 - best_distance) * 100:.2f}%"
+                        }), 200
+                    else:
+                        logger.warning("No matching faces found")
+                        return jsonify({
+                            'success': False,
+                            'error': 'Face not recognized'
+                        }), 401
 
                 except Exception as e:
                     logger.error(f"Image processing error: {str(e)}")
@@ -1,14 +1,74 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import cv2
-from utils import register_user, login_user, convert_cv2_to_tkinter, login_user_traditional, capture_image
+from utils import register_user, login_user, convert_cv2_to_tkinter, login_user_traditional, encode_jpeg
 import threading
-import time
-import base64
 import requests
-from queue import Queue
+from queue import Queue, Empty
 import numpy as np
 from collections import deque
+import os
+import time
+
+try:
+    import dlib  # Optional: landmark-based blink detection for liveness
+except ImportError:
+    dlib = None
+
+# Detection runs on a half-size copy of the frame, a quarter of the pixels
+DETECT_SCALE = 0.5
+# A face 30-60cm from a webcam spans roughly 120-400px at full size, so smaller and
+# larger pyramid levels are skipped entirely (sizes below are for the downscaled frame)
+FACE_DETECT_PARAMS = dict(
+    scaleFactor=1.2,
+    minNeighbors=5,
+    minSize=(60, 60),
+    maxSize=(200, 200),
+    flags=cv2.CASCADE_SCALE_IMAGE
+)
+
+# Resolve the bundled cascade directories once instead of on every lookup
+HAAR_DIR = cv2.data.haarcascades
+LBP_DIR = HAAR_DIR.replace('haarcascades', 'lbpcascades')
+
+def load_face_cascade():
+    """Load the LBP face cascade (integer features, faster on CPU), falling back to Haar"""
+    cascade = cv2.CascadeClassifier(LBP_DIR + 'lbpcascade_frontalface_improved.xml')
+    if cascade.empty():
+        # pip builds of OpenCV only ship the Haar cascades
+        cascade = cv2.CascadeClassifier(HAAR_DIR + 'haarcascade_frontalface_default.xml')
+    return cascade
+
+# Cascades are parsed once at import and shared by every FaceAuthApp
+FACE_CASCADE = load_face_cascade()
+EYE_CASCADE = cv2.CascadeClassifier(HAAR_DIR + 'haarcascade_eye.xml')
+
+# detectMultiScale is not guaranteed thread-safe; the grabber thread and capture share the cascade
+CASCADE_LOCK = threading.Lock()
+
+# Blink liveness from the eye aspect ratio (EAR) of 68-point facial landmarks
+LANDMARKS_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shape_predictor_68_face_landmarks.dat')
+EAR_BLINK_THRESHOLD = 0.2  # Eyes count as closed below this ratio
+EAR_WINDOW = 10  # Samples of EAR history searched for a blink
+# Landmarks are sampled off the grab loop at this interval, fast enough to catch a ~150ms blink
+BLINK_SAMPLE_INTERVAL = 0.05
+BLINK_MAX_AGE = 3.0  # Seconds a blink stays valid for the next liveness check
+
+def load_landmark_predictor():
+    """Load the dlib landmark model, or None to fall back to the eye cascade"""
+    if dlib is None or not os.path.exists(LANDMARKS_MODEL):
+        return None
+    return dlib.shape_predictor(LANDMARKS_MODEL)
+
+LANDMARK_PREDICTOR = load_landmark_predictor()
+
+def eye_aspect_ratio(eye):
+    """EAR of one eye from its six landmarks: (|p2-p6| + |p3-p5|) / (2|p1-p4|)"""
+    p1, p2, p3, p4, p5, p6 = eye
+    return (np.linalg.norm(p2 - p6) + np.linalg.norm(p3 - p5)) / (2.0 * np.linalg.norm(p1 - p4))
+
+PREVIEW_INTERVAL_MS = 33  # ~30 FPS preview
+PREVIEW_WIDTH, PREVIEW_HEIGHT = 640, 480
 
 class FaceAuthApp:
     def __init__(self, root):
@@ -20,14 +80,32 @@ class FaceAuthApp:
         self.username = tk.StringVar()
         self.preview_image = None
         self.captured_image = None
-        self.captured_base64 = None
+        self.captured_jpeg = None
         self.camera_active = False
         self.cap = None
+        # Newest camera frame, written by the grabber thread
+        self.latest_frame = None
+        self.frame_lock = threading.Lock()
+        self.grab_failed = False
+        self.shown_frame = None
+        self.grabber_thread = None
+        # Set to stop the grabber thread without waiting out its retry sleep
+        self.stop_capture = threading.Event()
+        self.blink_thread = None
+        # Recent eye aspect ratios and when the last blink finished (time.monotonic)
+        self.ear_history = deque(maxlen=EAR_WINDOW)
+        self.last_blink_time = None
+        # Preview buffers reused for every frame
+        self.preview_bgr = np.empty((PREVIEW_HEIGHT, PREVIEW_WIDTH, 3), dtype=np.uint8)
+        self.preview_rgb = np.empty_like(self.preview_bgr)
+        self.preview_photo = None
         
+        # Registrations are processed in order; logins only need the latest attempt
         self.api_queue = Queue()
-        self.start_api_thread()
+        self.start_api_thread(self.api_queue)
+        self.login_queue = Queue()
+        self.start_api_thread(self.login_queue, coalesce=True)
         
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         self.registration_angles = deque(['front', 'left', 'right'])
         self.captured_angles = {}
         self.password = tk.StringVar()
@@ -38,6 +116,8 @@ class FaceAuthApp:
         
         self.setup_ui()
         self.initialize_camera()
+        # Preview is refreshed from the Tk main loop; only capture runs on a thread
+        self.root.after(PREVIEW_INTERVAL_MS, self.refresh_preview)
     
     def setup_ui(self):
         # Main container
@@ -105,10 +185,24 @@ class FaceAuthApp:
 
     def initialize_camera(self):
         """Try to initialize the camera and update UI accordingly"""
+        # Camera and grabber thread are singletons; never open the device twice
+        if self.grabber_thread is not None and self.grabber_thread.is_alive():
+            if not self.stop_capture.is_set():
+                return
+            # A previous session is still stopping; its grabber releases the device on exit
+            self.grabber_thread.join(timeout=2.0)
+            if self.grabber_thread.is_alive():
+                self.status_label.config(text="Camera is still shutting down, please try again")
+                return
+        if self.cap:
+            # Only reached without a live grabber, e.g. after a failed initialization
+            self.cap.release()
         try:
             self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # Try DirectShow
             if not self.cap.isOpened():
                 raise Exception("Could not open camera")
+            # Keep the driver queue short so grabbed frames are current
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
             # Test capture
             ret, _ = self.cap.read()
@@ -118,8 +212,13 @@ class FaceAuthApp:
             self.camera_active = True
             self.camera_btn.config(text="Stop Camera")
             self.status_label.config(text="Camera initialized successfully")
-            self.camera_thread = threading.Thread(target=self.update_preview, daemon=True)
-            self.camera_thread.start()
+            # A fresh event per session, so threads of a previous session can never be revived
+            self.stop_capture = threading.Event()
+            self.grabber_thread = threading.Thread(target=self.grab_frames, args=(self.cap, self.stop_capture), daemon=True)
+            self.grabber_thread.start()
+            if LANDMARK_PREDICTOR is not None:
+                self.blink_thread = threading.Thread(target=self.watch_blinks, args=(self.stop_capture,), daemon=True)
+                self.blink_thread.start()
             
         except Exception as e:
             self.camera_active = False
@@ -134,34 +233,92 @@ class FaceAuthApp:
         """Toggle camera on/off"""
         if self.camera_active:
             self.camera_active = False
-            if self.cap:
-                self.cap.release()
+            # The grabber releases the device itself once its loop ends, so a grab()
+            # still in progress never runs against a released capture
+            self.stop_capture.set()
+            if self.grabber_thread:
+                self.grabber_thread.join(timeout=0.5)
             self.cap = None
+            with self.frame_lock:
+                self.latest_frame = None
             self.camera_btn.config(text="Start Camera")
             self.preview_label.config(image='', text="Camera stopped")
+            self.preview_photo = None
         else:
             self.initialize_camera()
     
-    def update_preview(self):
-        """Update camera preview"""
-        while self.camera_active:
+    def grab_frames(self, cap, stop):
+        """Continuously grab camera frames, keeping only the newest one; releases cap on exit"""
+        try:
+            while not stop.is_set():
+                if not cap.grab():
+                    self.grab_failed = True
+                    if stop.wait(0.1):
+                        break
+                    continue
+                ret, frame = cap.retrieve()
+                if ret:
+                    with self.frame_lock:
+                        self.latest_frame = frame
+                    self.grab_failed = False
+        finally:
+            cap.release()
+    
+    def watch_blinks(self, stop):
+        """Track blinks on the newest frame every BLINK_SAMPLE_INTERVAL, apart from the grab loop"""
+        checked = None
+        while not stop.wait(BLINK_SAMPLE_INTERVAL):
+            frame = self.get_latest_frame()
+            if frame is None or frame is checked:
+                continue
+            checked = frame
             try:
-                if self.cap and self.cap.isOpened():
-                    ret, frame = self.cap.read()
-                    if ret:
-                        # Resize frame to fit UI
-                        frame = cv2.resize(frame, (640, 480))
-                        # Convert to Tkinter image
-                        photo = convert_cv2_to_tkinter(frame)
+                self.track_blink(frame)
+            except Exception as e:
+                print(f"Blink tracking error: {str(e)}")
+    
+    def track_blink(self, frame):
+        """Update the EAR history from a frame and note a blink: eyes closed, then open again"""
+        has_face, face_rect, gray = self.detect_face(frame)
+        if not has_face:
+            return
+        x, y, w, h = (int(v) for v in face_rect)
+        shape = LANDMARK_PREDICTOR(gray, dlib.rectangle(x, y, x + w, y + h))
+        points = np.array([(p.x, p.y) for p in shape.parts()], dtype=np.float64)
+        # Landmarks 36-41 and 42-47 outline the two eyes
+        ear = (eye_aspect_ratio(points[36:42]) + eye_aspect_ratio(points[42:48])) / 2.0
+        self.ear_history.append(ear)
+        if ear >= EAR_BLINK_THRESHOLD and min(self.ear_history) < EAR_BLINK_THRESHOLD:
+            self.last_blink_time = time.monotonic()
+            self.ear_history.clear()
+    
+    def get_latest_frame(self):
+        """Return the newest grabbed frame, or None if none is available yet"""
+        with self.frame_lock:
+            return self.latest_frame
+    
+    def refresh_preview(self):
+        """Show the newest frame in the preview label, then reschedule on the Tk main loop"""
+        try:
+            if self.camera_active:
+                if self.grab_failed:
+                    self.status_label.config(text="Failed to grab frame")
+                frame = self.get_latest_frame()
+                # Skip the conversion when no new frame arrived since the last refresh
+                if frame is not None and frame is not self.shown_frame:
+                    self.shown_frame = frame
+                    # Resize frame to fit UI
+                    cv2.resize(frame, (PREVIEW_WIDTH, PREVIEW_HEIGHT), dst=self.preview_bgr)
+                    # Convert to Tkinter image, pasting into the existing PhotoImage when possible
+                    photo = convert_cv2_to_tkinter(self.preview_bgr, self.preview_photo, self.preview_rgb)
+                    if photo is not self.preview_photo:
                         # Update label
                         self.preview_label.configure(image=photo)
                         self.preview_label.image = photo
-                    else:
-                        self.status_label.config(text="Failed to grab frame")
-                time.sleep(0.03)  # Limit to ~30 FPS
-            except Exception as e:
-                self.status_label.config(text=f"Preview error: {str(e)}")
-                time.sleep(1)  # Wait before retrying
+                        self.preview_photo = photo
+        except Exception as e:
+            self.status_label.config(text=f"Preview error: {str(e)}")
+        self.root.after(PREVIEW_INTERVAL_MS, self.refresh_preview)
     
     def capture(self):
         """Enhanced capture with face detection and angle guidance"""
@@ -170,18 +327,18 @@ class FaceAuthApp:
             return
         
         try:
-            ret, frame = self.cap.read()
-            if not ret:
+            frame = self.get_latest_frame()
+            if frame is None:
                 messagebox.showwarning("Warning", "Could not capture frame!")
                 return
             
             # Check for face and liveness
-            has_face, face_rect = self.detect_face(frame)
+            has_face, face_rect, gray = self.detect_face(frame)
             if not has_face:
                 messagebox.showwarning("Warning", "No face detected!")
                 return
                 
-            is_live = self.check_liveness(frame)
+            is_live = self.check_liveness(gray, face_rect)
             if not is_live:
                 messagebox.showwarning("Warning", "Liveness check failed! Please blink naturally.")
                 return
@@ -189,15 +346,16 @@ class FaceAuthApp:
             # For registration, capture multiple angles
             if len(self.registration_angles) > 0:
                 current_angle = self.registration_angles[0]
-                self.captured_angles[current_angle] = frame
+                # Keep the compressed JPEG rather than the raw frame for each angle
+                jpeg = encode_jpeg(frame)
+                self.captured_angles[current_angle] = jpeg
                 self.registration_angles.rotate(-1)
                 self.angle_label.config(text=f"Please turn your head slightly to the {self.registration_angles[0]}")
                 
                 if len(self.captured_angles) >= 3:
                     # Combine all angles for registration
-                    self.captured_image = frame  # Use front face as primary
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    self.captured_base64 = base64.b64encode(buffer).decode('utf-8')
+                    self.captured_image = frame
+                    self.captured_jpeg = jpeg
                     self.status_label.config(text="All angles captured successfully!")
                     self.angle_label.config(text="")
                     return
@@ -205,15 +363,14 @@ class FaceAuthApp:
             else:
                 # Normal capture for login
                 self.captured_image = frame
-                _, buffer = cv2.imencode('.jpg', frame)
-                self.captured_base64 = base64.b64encode(buffer).decode('utf-8')
+                self.captured_jpeg = encode_jpeg(frame)
                 self.status_label.config(text="Image captured successfully!")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to capture image: {str(e)}")
     
     def register(self):
-        if not self.captured_base64:
+        if not self.captured_jpeg:
             messagebox.showwarning("Warning", "Please capture an image first!")
             return
         
@@ -222,7 +379,7 @@ class FaceAuthApp:
             return
         
         try:
-            response = register_user(self.username.get(), self.captured_base64)
+            response = register_user(self.username.get(), self.captured_jpeg)
             if 'error' in response:
                 messagebox.showerror("Error", response['error'])
             else:
@@ -231,12 +388,20 @@ class FaceAuthApp:
         except Exception as e:
             messagebox.showerror("Error", f"Registration failed: {str(e)}")
     
-    def start_api_thread(self):
-        """Start a thread to handle API calls"""
+    def start_api_thread(self, api_queue, coalesce=False):
+        """Start a thread to handle API calls
+        With coalesce, requests that piled up behind a slow call are dropped in favour of the newest one.
+        """
         def process_api_queue():
             while True:
                 try:
-                    func, args, callback = self.api_queue.get()
+                    func, args, callback = api_queue.get()
+                    if coalesce:
+                        try:
+                            while True:
+                                func, args, callback = api_queue.get_nowait()
+                        except Empty:
+                            pass
                     result = func(*args)
                     self.root.after(0, callback, result)
                 except Exception as e:
@@ -249,7 +414,8 @@ class FaceAuthApp:
         """Start face recognition login process"""
         self.preview_frame.grid()
         self.status_label.config(text="Please look at the camera for face recognition")
-        self.initialize_camera()
+        if not self.camera_active:
+            self.initialize_camera()
         
     def register_face(self):
         """Handle face registration"""
@@ -261,15 +427,17 @@ class FaceAuthApp:
             messagebox.showwarning("Warning", "Please enter a password!")
             return
             
-        if not self.captured_base64:
+        if not self.captured_jpeg:
             messagebox.showwarning("Warning", "Please capture your face image!")
             return
             
         try:
+            # Send every captured angle in one request when all of them are available
+            face_images = dict(self.captured_angles) if len(self.captured_angles) >= 3 else self.captured_jpeg
             # Add registration request to queue
             self.api_queue.put((
                 register_user,
-                (self.captured_base64, self.password.get(), self.username.get()),
+                (face_images, self.password.get(), self.username.get()),
                 self.handle_registration_response
             ))
             self.status_label.config(text="Processing registration...")
@@ -289,7 +457,8 @@ class FaceAuthApp:
             # Clear form and hide registration frame
             self.username.set("")
             self.password.set("")
-            self.captured_base64 = None
+            self.captured_jpeg = None
+            self.captured_angles = {}
             self.registration_frame.grid_remove()
             self.preview_frame.grid_remove()
     
@@ -329,47 +498,87 @@ class FaceAuthApp:
     
     def __del__(self):
         """Cleanup on exit"""
-        if self.cap:
+        self.stop_capture.set()
+        # With a grabber running, it releases the capture itself when it stops
+        if self.cap and (self.grabber_thread is None or not self.grabber_thread.is_alive()):
             self.cap.release()
 
         # Ensure traditional login frame is hidden on exit
         self.traditional_login_Frame_hide()
     
     def detect_face(self, frame):
-        """Detect face in frame and return face rectangle"""
+        """Detect face in frame
+        Returns:
+            (has_face, face rectangle or None, grayscale frame for reuse by check_liveness)
+        """
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-        return len(faces) > 0, faces[0] if len(faces) > 0 else None
+        small = cv2.resize(gray, None, fx=DETECT_SCALE, fy=DETECT_SCALE, interpolation=cv2.INTER_AREA)
+        with CASCADE_LOCK:
+            faces = FACE_CASCADE.detectMultiScale(small, **FACE_DETECT_PARAMS)
+        if len(faces) == 0:
+            return False, None, gray
+        # Map the rectangle back to full-resolution coordinates
+        face_rect = (faces[0] / DETECT_SCALE).astype(int)
+        return True, face_rect, gray
     
-    def check_liveness(self, frame):
-        """Basic liveness detection using eye blink detection"""
+    def check_liveness(self, gray, face_rect):
+        """Basic liveness detection using eye blink detection on an already detected face"""
+        if LANDMARK_PREDICTOR is not None:
+            # Require a blink within the last few seconds; each check consumes it, pass or fail
+            blink_time, self.last_blink_time = self.last_blink_time, None
+            return blink_time is not None and time.monotonic() - blink_time <= BLINK_MAX_AGE
         # This is a simplified version. In production, you'd want more sophisticated liveness detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-        
-        for (x, y, w, h) in faces:
-            roi_gray = gray[y:y+h, x:x+w]
-            eyes = eye_cascade.detectMultiScale(roi_gray)
-            return len(eyes) >= 2
-        return False
+        x, y, w, h = face_rect
+        roi_gray = gray[y:y+h, x:x+w]
+        eyes = EYE_CASCADE.detectMultiScale(roi_gray)
+        return len(eyes) >= 2
     
     def login_face(self):
         """Login with face image"""
+        if not self.cap or not self.camera_active:
+            messagebox.showwarning("Warning", "Camera is not active!")
+            return
+        
         try:
-            login_image_base64, _ = capture_image()  # Capture image
-            ...
+            # Use the shared camera's newest frame rather than opening the device a second time
+            frame = self.get_latest_frame()
+            if frame is None:
+                messagebox.showwarning("Warning", "Could not capture frame!")
+                return
+            has_face, face_rect, gray = self.detect_face(frame)
+            if not has_face:
+                messagebox.showwarning("Warning", "No face detected!")
+                return
+            if not self.check_liveness(gray, face_rect):
+                messagebox.showwarning("Warning", "Liveness check failed! Please blink naturally.")
+                return
+            login_image_jpeg = encode_jpeg(frame)
+            self.login_queue.put((login_user, (login_image_jpeg,), self.handle_login_response))
+            self.status_label.config(text="Verifying face...")
         except Exception as e:
             print(f"Login error: {str(e)}")  # Debugging line
             self.status_label.config(text=f"Login error: {str(e)}")
             messagebox.showerror("Error", f"Login error: {str(e)}")
     
+    def handle_login_response(self, response):
+        """Handle face login response, offering traditional login after repeated failures"""
+        if 'error' in response:
+            self.failed_login_attempts += 1
+            self.status_label.config(text=f"Login failed: {response['error']}")
+            if self.failed_login_attempts >= self.max_failed_attempts:
+                self.traditional_login_Frame_show()
+        else:
+            self.failed_login_attempts = 0
+            self.status_label.config(text=f"Logged in as: {response['username']}")
+            messagebox.showinfo("Success", f"Login successful!\nUsername: {response['username']}")
+    
     def show_registration_form(self):
         """Show registration form and camera preview"""
         self.registration_frame.grid()
         self.preview_frame.grid()
         self.status_label.config(text="Please enter your details and capture your face")
-        self.initialize_camera()
+        if not self.camera_active:
+            self.initialize_camera()
     
     def renderAuthUI(self):
         # Replace JSX with Tkinter widgets
@@ -1,6 +1,7 @@
-import base64
 import cv2
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from PIL import Image, ImageTk
 import io
@@ -8,16 +9,37 @@ import logging
 from flask import jsonify
 import os
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR  # Optional: libjpeg-turbo SIMD encoder
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, OSError):
+    # OSError: PyTurboJPEG installed but the libjpeg-turbo shared library is missing
+    _turbo_jpeg = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 SERVER_URL = "http://127.0.0.1:5001"
+JPEG_QUALITY = 80  # Plenty for face matching, about half the size and encode time of the default 95
+# One keep-alive session for all auth calls; only connection failures are retried
+# since POSTs are not idempotent
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=Retry(total=2, backoff_factor=0.1)))
+_session.headers.update({'Connection': 'keep-alive'})
+
 USERS_DIR = "users"
 if not os.path.exists(USERS_DIR):
     os.makedirs(USERS_DIR)
 
+def encode_jpeg(frame):
+    """Encode a BGR frame to JPEG bytes"""
+    if _turbo_jpeg is not None:
+        return _turbo_jpeg.encode(frame, quality=JPEG_QUALITY, pixel_format=TJPF_BGR)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer.tobytes()
+
 def capture_image():
-    """Capture image from webcam and return base64 string"""
+    """Capture image from webcam and return JPEG bytes and the frame"""
     cap = cv2.VideoCapture(0)
     ret, frame = cap.read()
     print(f"ret: {ret}, frame: {frame}")
@@ -27,20 +49,24 @@ def capture_image():
         raise Exception("Could not capture image from webcam")
     
     # Convert to jpg
-    _, buffer = cv2.imencode('.jpg', frame)
-    # Convert to base64
-    base64_image = base64.b64encode(buffer).decode('utf-8')
-    return base64_image, frame
+    return encode_jpeg(frame), frame
 
-def register_user(face_image_base64, password, username):
-    """Register a new user with face image, password, and username"""
+def register_user(face_image_jpeg, password, username):
+    """Register a new user with face image, password, and username
+    face_image_jpeg is JPEG bytes, or a dict of angle name -> JPEG bytes sent together in one request
+    """
     try:
-        response = requests.post(
+        # Send the JPEGs as binary multipart files rather than base64 inside JSON
+        if isinstance(face_image_jpeg, dict):
+            files = [('images', (f'{angle}.jpg', jpeg, 'image/jpeg')) for angle, jpeg in face_image_jpeg.items()]
+        else:
+            files = {'image': ('face.jpg', face_image_jpeg, 'image/jpeg')}
+        response = _session.post(
             f"{SERVER_URL}/register",
-            json={
+            files=files,
+            data={
                 'username': username,
-                'password': password,
-                'image': face_image_base64
+                'password': password
             }
         )
         return response.json()
@@ -48,17 +74,14 @@ def register_user(face_image_base64, password, username):
         logger.error(f"Registration request failed: {str(e)}")
         return {"error": f"Registration request failed: {str(e)}"}
 
-def login_user(face_image_base64):
+def login_user(face_image_jpeg):
     """Login with face image"""
     try:
         logger.info("Sending login request to server")
-        response = requests.post(
+        response = _session.post(
             f"{SERVER_URL}/auth",
-            json={
-                'mode': 'login',
-                'faceImage': face_image_base64
-            },
-            headers={'Content-Type': 'application/json'}
+            files={'faceImage': ('face.jpg', face_image_jpeg, 'image/jpeg')},
+            data={'mode': 'login'}
         )
         
         if response.status_code != 200:
@@ -73,19 +96,26 @@ def login_user(face_image_base64):
         logger.error(f"Login error: {str(e)}")
         return {"error": f"Login error: {str(e)}"}
 
-def convert_cv2_to_tkinter(cv2_image):
-    """Convert OpenCV image to Tkinter compatible image"""
+def convert_cv2_to_tkinter(cv2_image, photo=None, rgb_buffer=None):
+    """Convert OpenCV image to Tkinter compatible image
+    Pass the previous PhotoImage and a preallocated RGB buffer of the same shape
+    to reuse them instead of allocating new ones for every frame.
+    """
     # Convert from BGR to RGB
-    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
-    # Convert to PIL Image
-    pil_image = Image.fromarray(rgb_image)
+    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB, dst=rgb_buffer)
+    height, width = rgb_image.shape[:2]
+    # Wrap the RGB buffer as a PIL Image without copying it
+    pil_image = Image.frombuffer('RGB', (width, height), rgb_image, 'raw', 'RGB', 0, 1)
+    if photo is not None and photo.width() == width and photo.height() == height:
+        photo.paste(pil_image)
+        return photo
     # Convert to PhotoImage
     return ImageTk.PhotoImage(pil_image)
 
 def login_user_traditional(username, password):
     """Traditional login using username and password"""
     try:
-        response = requests.post(
+        response = _session.post(
             f"{SERVER_URL}/traditional_login",
             json={
                 'username': username,
@@ -3,6 +3,7 @@ from fastapi import HTTPException, File, UploadFile, Form
 from pydantic import BaseModel
 from typing import Optional, Dict
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 import base64
@@ -18,6 +19,8 @@ from utils import setup_server, DataManager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EARLY_MATCH_SIMILARITY = 0.9  # Stop comparing once a match is at least this similar
+
 class AuthRequest(BaseModel):
     user_id: str
     metadata: Optional[Dict] = None
@@ -26,6 +29,8 @@ class FaceAuthServer(BaseServer):
     def __init__(self):
         super().__init__("FaceAuth")
         self.data_manager, self.server_manager = setup_server()
+        # TensorFlow releases the GIL during inference, so comparisons run in parallel threads
+        self.verify_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
         
         @self.app.post("/register")
         async def register_face(
@@ -186,62 +191,65 @@ class FaceAuthServer(BaseServer):
             if not faces:
                 raise HTTPException(status_code=400, detail="No face detected in image")
             
-            # Save temporary image for verification
-            temp_path = os.path.join(self.data_manager.data_dir, "temp_verify.jpg")
-            cv2.imwrite(temp_path, img)
-            
+            # Compare against every stored face in parallel, off the event loop
+            loop = asyncio.get_running_loop()
+            comparisons = [
+                loop.run_in_executor(self.verify_executor, self._compare_face, img, username, face_path)
+                for username, user_data in self.data_manager.users_cache.items()
+                for face_path in user_data.get('face_paths', [])
+            ]
+            matches = []
             try:
-                # Find matching face
-                matches = []
-                for username, user_data in self.data_manager.users_cache.items():
-                    for face_path in user_data.get('face_paths', []):
-                        try:
-                            result = DeepFace.verify(
-                                img1_path=temp_path,
-                                img2_path=face_path,
-                                enforce_detection=False,
-                                model_name="VGG-Face",
-                                distance_metric="cosine"
-                            )
-                            
-                            if result.get('verified', False):
-                                similarity = 1 - result.get('distance', 1.0)
-                                matches.append((username, similarity))
-                        except Exception as e:
-                            logger.error(f"Face comparison error: {str(e)}")
-                            continue
-                
-                # Clean up temporary file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                
-                if matches:
-                    # Get best match
-                    matches.sort(key=lambda x: x[1], reverse=True)
-                    best_match, confidence = matches[0]
-                    
-                    return {
-                        "status": "success",
-                        "verified": True,
-                        "user_id": best_match,
-                        "confidence": f"{confidence:.2%}"
-                    }
-                else:
-                    return {
-                        "status": "success",
-                        "verified": False,
-                        "message": "No matching face found"
-                    }
-                    
+                for comparison in asyncio.as_completed(comparisons):
+                    username, similarity = await comparison
+                    if similarity is not None:
+                        matches.append((username, similarity))
+                        if similarity >= EARLY_MATCH_SIMILARITY:
+                            break
             finally:
-                # Ensure temporary file is removed
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+                # Drop comparisons that have not started once the outcome is known
+                for comparison in comparisons:
+                    comparison.cancel()
+            
+            if matches:
+                # Get best match
+                matches.sort(key=lambda x: x[1], reverse=True)
+                best_match, confidence = matches[0]
+                
+                return {
+                    "status": "success",
+                    "verified": True,
+                    "user_id": best_match,
+                    "confidence": f"{confidence:.2%}"
+                }
+            else:
+                return {
+                    "status": "success",
+                    "verified": False,
+                    "message": "No matching face found"
+                }
                     
         except Exception as e:
             logger.error(f"Verification error: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
     
+    def _compare_face(self, img: np.ndarray, username: str, face_path: str):
+        """Compare an image with one stored face, returning (username, similarity or None)"""
+        try:
+            # Pass the decoded array straight to DeepFace
+            result = DeepFace.verify(
+                img1_path=img,
+                img2_path=face_path,
+                enforce_detection=False,
+                model_name="VGG-Face",
+                distance_metric="cosine"
+            )
+            if result.get('verified', False):
+                return username, 1 - result.get('distance', 1.0)
+        except Exception as e:
+            logger.error(f"Face comparison error: {str(e)}")
+        return username, None
+    
     def _process_image_data(self, image_data: bytes) -> np.ndarray:
         """Process image data into OpenCV format"""
         try:
@@ -0,0 +1,12 @@
+"""WSGI entry point for the face authentication API
+
+Run from this directory with:
+    gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5001 wsgi:app
+
+TensorFlow releases the GIL during inference, so threads serve concurrent
+logins in parallel while sharing one copy of the model and face gallery.
+"""
+from api import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5001)
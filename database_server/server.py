@@ -1,8 +1,9 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, status, File, Form, UploadFile
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 from contextlib import asynccontextmanager
 import jwt
 import datetime
@@ -12,12 +13,22 @@ from dotenv import load_dotenv
 import asyncio
 import cv2
 import numpy as np
-import base64
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module
+except ImportError:
+    import base64
+import binascii
 from deepface import DeepFace
+from deepface.modules.verification import find_threshold
 import uuid
+import io
+import hashlib
+import time
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
 
 # Import bot module
-from bot import bot, start_bot
+from bot import bot, start_bot, FACE_EMBEDDING_SUFFIX
 from face_auth.utils import setup_server
 
 # Load environment variables
@@ -33,18 +44,29 @@ data_manager, server_manager = setup_server()
 # Lifespan context manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    bot_task: Optional[asyncio.Task] = None
+    batcher_task: Optional[asyncio.Task] = None
     # Startup
     try:
         # Start bot in background task
         bot_task = asyncio.create_task(start_bot())
         logger.info("Discord bot startup initiated")
+        # Load the face model while the bot connects, so the first login doesn't pay for it
+        await asyncio.get_running_loop().run_in_executor(inference_executor, warmup_face_model)
+        # Created here rather than at import so it belongs to the loop uvicorn runs (Python < 3.10)
+        queue = asyncio.Queue()
+        batcher_task = asyncio.create_task(face_batcher(queue))
+        batcher_task.add_done_callback(lambda task: face_batcher_stopped(queue))
+        set_face_batch_queue(queue)
         yield
     finally:
         # Shutdown
-        if 'bot_task' in locals():
-            bot_task.cancel()
+        for task in (batcher_task, bot_task):
+            if task is None:
+                continue
+            task.cancel()
             try:
-                await bot_task
+                await task
             except asyncio.CancelledError:
                 pass
         logger.info("Discord bot shutdown complete")
@@ -54,7 +76,8 @@ app = FastAPI(
     title="JARVIS Database Server",
     description="API server for JARVIS database management",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -69,10 +92,35 @@ app.add_middleware(
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")  # Change in production
 ALGORITHM = "HS256"
+# Built once rather than per token: the key as bytes, the allowed algorithms and claim checks
+SIGNING_KEY = VERIFY_KEY = SECRET_KEY.encode()
+
+# Optional Ed25519 keypair (PEM files): other services can then verify tokens with the
+# public key alone instead of sharing the HMAC secret
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE")
+JWT_PUBLIC_KEY_FILE = os.getenv("JWT_PUBLIC_KEY_FILE")
+if JWT_PRIVATE_KEY_FILE:
+    from cryptography.hazmat.primitives import serialization
+
+    ALGORITHM = "EdDSA"
+    with open(JWT_PRIVATE_KEY_FILE, "rb") as f:
+        SIGNING_KEY = serialization.load_pem_private_key(f.read(), password=None)
+    if JWT_PUBLIC_KEY_FILE:
+        with open(JWT_PUBLIC_KEY_FILE, "rb") as f:
+            VERIFY_KEY = serialization.load_pem_public_key(f.read())
+    else:
+        VERIFY_KEY = SIGNING_KEY.public_key()
+JWT_ALGORITHMS = [ALGORITHM]
+JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Recently validated tokens: sha256(token) -> (user, exp); skips jwt.decode for repeat callers
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 5  # seconds
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
 # Data models
 class User(BaseModel):
     username: str
@@ -134,8 +182,267 @@ class FaceVerifyResponse(BaseModel):
     access_token: Optional[str] = None
     jarvis_user_id: Optional[str] = None
 
-# Store user IDs (in memory - replace with database in production)
-user_tokens = {}
+# Face matching
+FACE_MODEL_NAME = "VGG-Face"
+# Same acceptance rule as the DeepFace.verify call this replaced: VGG-Face embeddings
+# compared by cosine distance, against the installed DeepFace's own tuned threshold
+VERIFY_MAX_COSINE_DISTANCE = find_threshold(FACE_MODEL_NAME, "cosine")
+MATCH_THRESHOLD = 1 - VERIFY_MAX_COSINE_DISTANCE  # Minimum cosine similarity for a face match
+FACE_AUTH_PREFIX = "JARVIS_USER_ID: "
+FACE_MODEL = None  # Built once at startup
+FACE_BATCH_SIZE = 16  # Most images embedded in one forward pass
+FACE_BATCH_WINDOW = 0.01  # Seconds a queued image waits for others to share its batch
+# Encoded images at least this large are phone/camera shots; decode them at half size,
+# which libjpeg does in the IDCT. Plenty for a face the model sees at 224x224
+REDUCED_DECODE_MIN_BYTES = 1 << 20
+FACE_EMBED_TIMEOUT = 30.0  # Seconds a request waits for its embedding before failing
+
+# username -> (face-auth message id, L2-normalised embedding or None until first use)
+face_embeddings = {}
+face_embeddings_loaded = False
+# Created on first use, inside the running loop (asyncio primitives bind to a loop before Python 3.10)
+face_embeddings_lock: Optional[asyncio.Lock] = None
+
+def get_face_embeddings_lock() -> asyncio.Lock:
+    global face_embeddings_lock
+    if face_embeddings_lock is None:
+        face_embeddings_lock = asyncio.Lock()
+    return face_embeddings_lock
+
+# Image decoding and DeepFace inference run here; OpenCV and TensorFlow release the GIL,
+# so threads keep the event loop free without loading the model once per process
+inference_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def decode_image_data(image_data: str) -> bytes:
+    """Strictly decode a base64 (optionally data URL) image, raising ValueError if invalid"""
+    if image_data.startswith('data:'):
+        image_data = image_data.partition(',')[2]
+    try:
+        return base64.b64decode(image_data, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 image data: {str(e)}")
+
+def decode_image(image: Union[str, bytes]) -> np.ndarray:
+    """Decode an encoded image into a BGR array, strings are base64 (optionally data URL)"""
+    if isinstance(image, str):
+        image = decode_image_data(image)
+    flags = cv2.IMREAD_REDUCED_COLOR_2 if len(image) >= REDUCED_DECODE_MIN_BYTES else cv2.IMREAD_COLOR
+    img = cv2.imdecode(np.frombuffer(image, np.uint8), flags)
+    if img is None:
+        raise ValueError("Failed to decode image")
+    return img
+
+def extract_face(img: np.ndarray) -> np.ndarray:
+    """Detect and align the face in a BGR image, returned as a BGR float crop in [0, 1]"""
+    face = DeepFace.extract_faces(
+        img_path=img, detector_backend="opencv", enforce_detection=False, align=True
+    )[0]["face"]
+    # extract_faces hands back RGB, the model is fed the same channel order as cv2
+    return face[:, :, ::-1]
+
+def resize_face(face: np.ndarray, size) -> np.ndarray:
+    """Fit a face crop into (height, width) keeping its aspect ratio, padding with black,
+    the way DeepFace prepares faces so distances stay comparable with its thresholds
+    """
+    height, width = size
+    factor = min(height / face.shape[0], width / face.shape[1])
+    face = cv2.resize(face, (int(face.shape[1] * factor), int(face.shape[0] * factor)))
+    pad_height = height - face.shape[0]
+    pad_width = width - face.shape[1]
+    face = np.pad(
+        face,
+        ((pad_height // 2, pad_height - pad_height // 2), (pad_width // 2, pad_width - pad_width // 2), (0, 0)),
+        "constant",
+    )
+    if face.shape[:2] != (height, width):
+        face = cv2.resize(face, (width, height))
+    return face
+
+def encode_faces(faces: List[np.ndarray]) -> np.ndarray:
+    """Compute L2-normalised embeddings for aligned face crops in one forward pass
+    Returns:
+        (N, D) float32 array, one row per face
+    """
+    batch = np.stack([resize_face(face, FACE_MODEL.input_shape) for face in faces]).astype(np.float32)
+    embeddings = FACE_MODEL.model.predict(batch, batch_size=FACE_BATCH_SIZE, verbose=0).astype(np.float32)
+    return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+
+def compute_embedding(img: np.ndarray) -> np.ndarray:
+    """Compute the L2-normalised face embedding of a BGR image"""
+    return encode_faces([extract_face(img)])[0]
+
+def warmup_face_model():
+    """Build the face model and run a dummy forward pass so graph tracing happens at startup"""
+    global FACE_MODEL
+    FACE_MODEL = DeepFace.build_model(FACE_MODEL_NAME)
+    compute_embedding(np.zeros((224, 224, 3), dtype=np.uint8))
+    logger.info(f"{FACE_MODEL_NAME} model loaded and warmed up")
+
+def embed_images(images: List[Union[str, bytes]]) -> list:
+    """Decode and embed encoded images with a single forward pass
+    Returns:
+        one embedding per image, or the exception that image failed with
+    """
+    results = [None] * len(images)
+    faces, slots = [], []
+    for i, image in enumerate(images):
+        try:
+            faces.append(extract_face(decode_image(image)))
+            slots.append(i)
+        except Exception as e:
+            results[i] = e
+    if faces:
+        for i, embedding in zip(slots, encode_faces(faces)):
+            results[i] = embedding
+    return results
+
+# (encoded image, future) pairs waiting to be embedded by face_batcher; None while it isn't running
+face_batch_queue: Optional[asyncio.Queue] = None
+
+def set_face_batch_queue(queue: Optional[asyncio.Queue]):
+    global face_batch_queue
+    face_batch_queue = queue
+
+def face_batcher_stopped(queue: asyncio.Queue):
+    """Stop accepting images once the batcher exits and fail the ones still queued"""
+    if face_batch_queue is queue:
+        set_face_batch_queue(None)
+    while not queue.empty():
+        _, future = queue.get_nowait()
+        if not future.done():
+            future.set_exception(RuntimeError("Face embedding service stopped"))
+
+async def face_batcher(face_batch_queue: asyncio.Queue):
+    """Embed queued images in batches of up to FACE_BATCH_SIZE on the inference pool"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await face_batch_queue.get()]
+        deadline = loop.time() + FACE_BATCH_WINDOW
+        while len(batch) < FACE_BATCH_SIZE:
+            try:
+                batch.append(face_batch_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(face_batch_queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            results = await loop.run_in_executor(inference_executor, embed_images, [image for image, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # Caller already gave up
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+async def embed_image_async(image: Union[str, bytes]) -> np.ndarray:
+    """Decode and embed an image, batched with any concurrent requests"""
+    if face_batch_queue is None:
+        raise RuntimeError("Face embedding service is not running")
+    future = asyncio.get_running_loop().create_future()
+    face_batch_queue.put_nowait((image, future))
+    try:
+        return await asyncio.wait_for(future, timeout=FACE_EMBED_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise RuntimeError("Face embedding timed out")
+
+def serialize_embedding(embedding: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, embedding, allow_pickle=False)
+    return buffer.getvalue()
+
+async def load_face_embeddings():
+    """Warm the embedding cache from the face-auth channel, once per process"""
+    global face_embeddings_loaded
+    async with get_face_embeddings_lock():
+        if face_embeddings_loaded:
+            return
+        channel = await bot.get_channel_by_name('face-auth')
+        # Oldest first so a user's newest registration wins
+        async for message in channel.history(limit=None, oldest_first=True):
+            if not message.content.startswith(FACE_AUTH_PREFIX) or not message.attachments:
+                continue
+            username = message.content[len(FACE_AUTH_PREFIX):]
+            embedding = None
+            for attachment in message.attachments[1:]:
+                if attachment.filename.endswith(FACE_EMBEDDING_SUFFIX):
+                    embedding = np.load(io.BytesIO(await attachment.read()), allow_pickle=False)
+                    break
+            # Registrations without a current-format embedding are encoded on first login
+            face_embeddings[username] = (message.id, embedding)
+        face_embeddings_loaded = True
+
+async def clear_face_embeddings():
+    """Drop the embedding cache after the bot resets its channels"""
+    global face_embeddings_loaded
+    async with get_face_embeddings_lock():
+        face_embeddings.clear()
+        face_embeddings_loaded = False
+
+bot.add_listener(clear_face_embeddings, 'on_database_reset')
+
+async def get_face_embedding(username: str):
+    """Cached (message_id, embedding) for a user, or None if they have no face registered"""
+    await load_face_embeddings()
+    entry = face_embeddings.get(username)
+    if entry is None or entry[1] is not None:
+        return entry
+
+    message_id, _ = entry
+    channel = await bot.get_channel_by_name('face-auth')
+    message = await channel.fetch_message(message_id)
+    img_data = await message.attachments[0].read()
+    entry = (message_id, await embed_image_async(img_data))
+    face_embeddings[username] = entry
+    return entry
+
+async def store_registration(username: str, email: str, password: str, face_image: Optional[str] = None):
+    """Store credentials and optional face image in Discord concurrently
+    Returns:
+        (jarvis_user_id, face_auth_id), face_auth_id is None without a face image
+    """
+    if not face_image:
+        return await bot.send_auth(username, email, password), None
+
+    # Encode before anything is stored so an unreadable image fails the whole registration
+    image_bytes = decode_image_data(face_image)
+    embedding = await embed_image_async(image_bytes)
+    auth_task = asyncio.create_task(bot.send_auth(username, email, password))
+    face_task = asyncio.create_task(
+        bot.send_face_auth(username, image_bytes, serialize_embedding(embedding))
+    )
+    try:
+        jarvis_user_id, face_auth_id = await asyncio.gather(auth_task, face_task)
+        face_embeddings[username] = (int(face_auth_id), embedding)
+        return jarvis_user_id, face_auth_id
+    except Exception:
+        # One side failed: stop the other and wait for both to settle
+        for task in (auth_task, face_task):
+            task.cancel()
+        await asyncio.gather(auth_task, face_task, return_exceptions=True)
+
+        # Don't leave credentials or a face image behind for a registration that failed,
+        # otherwise the username and email stay taken and a retry can never succeed
+        if not auth_task.cancelled() and auth_task.exception() is None:
+            try:
+                await bot.delete_auth(auth_task.result(), username, email)
+            except Exception as e:
+                logger.error(f"Failed to roll back credentials for {username}: {str(e)}")
+        if not face_task.cancelled() and face_task.exception() is None:
+            try:
+                await bot.delete_message('face-auth', face_task.result())
+            except Exception as e:
+                logger.error(f"Failed to roll back face image for {username}: {str(e)}")
+        raise
 
 # Authentication endpoints
 @app.post("/token", response_model=Token)
@@ -155,12 +462,10 @@ async def register(user: User):
             auth_method = "face_auth"
         
         try:
-            # Always send authentication details to Discord
-            jarvis_user_id = await bot.send_auth(user.username, user.email, user.password)
-            
-            # If face auth is enabled, also store the face image
-            if user.face_image:
-                await bot.send_face_auth(user.username, user.face_image)
+            # Always send authentication details to Discord, with the face image if provided
+            jarvis_user_id, _ = await store_registration(
+                user.username, user.email, user.password, user.face_image
+            )
                 
         except Exception as e:
             logger.error(f"Discord communication error: {str(e)}")
@@ -171,12 +476,9 @@ async def register(user: User):
             "sub": user.username,
             "jarvis_user_id": jarvis_user_id,
             "auth_method": auth_method,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
+            "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=30)
         }
-        token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
-        
-        # Store the token mapping
-        user_tokens[token] = jarvis_user_id
+        token = jwt.encode(token_data, SIGNING_KEY, algorithm=ALGORITHM)
         
         return {
             "access_token": token,
@@ -227,9 +529,9 @@ async def login(request: LoginRequest):
             "sub": request.identifier,
             "jarvis_user_id": jarvis_user_id,
             "auth_method": auth_method,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
+            "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=30)
         }
-        access_token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
+        access_token = jwt.encode(token_data, SIGNING_KEY, algorithm=ALGORITHM)
         
         return {
             "access_token": access_token,
@@ -248,16 +550,27 @@ async def login(request: LoginRequest):
 
 # Dependency for verifying token
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    key = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(key)
+    if cached is not None:
+        user, exp = cached
+        # The cache TTL is short, but never serve a token past its own expiry
+        if exp is None or exp > time.time():
+            return dict(user)
+        token_cache.pop(key, None)
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, VERIFY_KEY, algorithms=JWT_ALGORITHMS, options=JWT_DECODE_OPTIONS)
         username: str = payload.get("sub")
         jarvis_user_id: str = payload.get("jarvis_user_id")
         if username is None or jarvis_user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication token")
-        return {"username": username, "jarvis_user_id": jarvis_user_id}
+        user = {"username": username, "jarvis_user_id": jarvis_user_id}
+        token_cache[key] = (user, payload.get("exp"))
+        return dict(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
 # Logs endpoint - Write to Discord logs channel
@@ -267,7 +580,7 @@ async def write_log(log: LogEntry, current_user: str = Depends(get_current_user)
         await bot.send_log(log.level, log.message, log.source)
         return {
             "status": "success",
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc),
             "message": "Log entry recorded to Discord"
         }
     except Exception as e:
@@ -281,7 +594,7 @@ async def write_error(error: ErrorEntry, current_user: str = Depends(get_current
         await bot.send_error(error.error_type, error.message, error.source, error.stack_trace)
         return {
             "status": "success",
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc),
             "message": "Error entry recorded to Discord"
         }
     except Exception as e:
@@ -309,7 +622,7 @@ async def create_project(project: Project, current_user: dict = Depends(get_curr
             
             return {
                 "status": "success",
-                "timestamp": datetime.datetime.now().isoformat(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc),
                 "message": f"Project {project.name} created successfully",
                 "project_id": message_id
             }
@@ -325,38 +638,51 @@ async def create_project(project: Project, current_user: dict = Depends(get_curr
 # Face authentication endpoint - Write to Discord face-auth channel
 @app.post("/face-auth")
 async def face_authentication(request: FaceAuthRequest, current_user: str = Depends(get_current_user)):
+    if not request.image_data:
+        raise HTTPException(status_code=400, detail="Image data is required")
+    try:
+        # Decode once, the bot uploads these bytes as-is
+        image_bytes = decode_image_data(request.image_data)
+    except ValueError as ve:
+        logger.error(f"Validation error in face authentication: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    return await store_face_upload(request.user_id, image_bytes)
+
+@app.post("/face-auth/upload")
+async def face_authentication_upload(
+    user_id: str = Form(...),
+    file: UploadFile = File(...),
+    current_user: str = Depends(get_current_user)
+):
+    """Face authentication from a multipart image upload, without base64"""
+    image_bytes = await file.read()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Image data is required")
+    return await store_face_upload(user_id, image_bytes)
+
+async def store_face_upload(user_id: str, image_bytes: bytes) -> dict:
+    """Store an uploaded face image in Discord for a user"""
     try:
-        if not request.image_data:
-            raise HTTPException(status_code=400, detail="Image data is required")
-            
-        # Clean up base64 image data if needed
-        image_data = request.image_data
-        if "data:image/png;base64," in image_data:
-            image_data = image_data.split("data:image/png;base64,")[1]
-            
-        # Validate base64 data
-        try:
-            # Check if the base64 string is valid
-            base64.b64decode(image_data)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid base64 image data: {str(e)}")
-            
         # Process with increased timeout
         try:
             message_id = await asyncio.wait_for(
-                bot.send_face_auth(request.user_id, image_data),
+                bot.send_face_auth(user_id, image_bytes),
                 timeout=20.0  # 20 seconds timeout
             )
+            # No embedding stored with this upload, it's encoded on first login
+            face_embeddings[user_id] = (int(message_id), None)
             
             return {
                 "status": "success",
-                "timestamp": datetime.datetime.now().isoformat(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc),
                 "message": "Face authentication processed and stored in Discord",
                 "face_auth_id": message_id
             }
         except asyncio.TimeoutError:
             raise HTTPException(status_code=504, detail="Face authentication processing timed out")
             
+    except HTTPException:
+        raise
     except ValueError as ve:
         logger.error(f"Validation error in face authentication: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -367,17 +693,26 @@ async def face_authentication(request: FaceAuthRequest, current_user: str = Depe
 @app.post("/face-auth/verify", response_model=FaceVerifyResponse)
 async def verify_face(request: FaceVerifyRequest):
     """Verify face authentication"""
+    return await face_verify_response(request.username, request.face_image)
+
+@app.post("/face-auth/verify-binary", response_model=FaceVerifyResponse)
+async def verify_face_binary(username: str = Form(...), file: UploadFile = File(...)):
+    """Verify face authentication from a multipart image upload, without base64"""
+    return await face_verify_response(username, await file.read())
+
+async def face_verify_response(username: str, face_image: Union[str, bytes]) -> FaceVerifyResponse:
+    """Verify a face and build the response, with a token on success"""
     try:
         # Verify the face
-        result = await verify_face_auth(request.username, request.face_image)
+        result = await verify_face_auth(username, face_image)
         
         if result["success"]:
             # Generate JWT token
             token_data = {
-                "sub": request.username,
-                "exp": datetime.datetime.utcnow() + datetime.timedelta(days=1)
+                "sub": username,
+                "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
             }
-            access_token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
+            access_token = jwt.encode(token_data, SIGNING_KEY, algorithm=ALGORITHM)
             
             return FaceVerifyResponse(
                 success=True,
@@ -401,20 +736,18 @@ async def verify_face(request: FaceVerifyRequest):
 @app.post("/face-auth/register", response_model=FaceAuthResponse)
 async def register_face(request: FaceRegisterRequest):
     try:
-        # Check if user already exists in Discord channel
-        channel = await bot.get_channel_by_name('face-auth')
-        async for message in channel.history(limit=None):
-            if message.content.startswith(f"JARVIS_USER_ID: {request.username}"):
-                return FaceAuthResponse(
-                    success=False,
-                    message="Username already exists"
-                )
-
-        # First store credentials in authentication channel
-        auth_message_id = await bot.send_auth(request.username, request.email, request.password)
+        # Check if user already has a face registered
+        await load_face_embeddings()
+        if request.username in face_embeddings:
+            return FaceAuthResponse(
+                success=False,
+                message="Username already exists"
+            )
 
-        # Then store face image in face-auth channel
-        face_auth_id = await bot.send_face_auth(request.username, request.face_image)
+        # Store credentials and face image in their channels concurrently
+        auth_message_id, face_auth_id = await store_registration(
+            request.username, request.email, request.password, request.face_image
+        )
         
         if not face_auth_id:
             raise ValueError("Failed to store face image")
@@ -422,9 +755,9 @@ async def register_face(request: FaceRegisterRequest):
         # Generate JWT token
         token_data = {
             "sub": request.username,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
+            "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=30)
         }
-        token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
+        token = jwt.encode(token_data, SIGNING_KEY, algorithm=ALGORITHM)
 
         return FaceAuthResponse(
             success=True,
@@ -440,48 +773,28 @@ async def register_face(request: FaceRegisterRequest):
             detail=f"Error during face registration: {str(e)}"
         )
 
-async def verify_face_auth(username: str, face_image: str) -> dict:
-    """Helper function to verify face authentication"""
+async def verify_face_auth(username: str, face_image: Union[str, bytes]) -> dict:
+    """Helper function to verify face authentication
+    Args:
+        username: user whose registered face to compare against
+        face_image: base64 string (optionally data URL) or raw encoded image bytes
+    """
     try:
-        # Get face-auth channel from Discord
-        channel = await bot.get_channel_by_name('face-auth')
-        
-        # Decode current face image
-        if 'data:image' in face_image:
-            face_image = face_image.split(',')[1]
-            
-        img_data = base64.b64decode(face_image)
-        nparr = np.frombuffer(img_data, np.uint8)
-        current_img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if current_img is None:
-            raise ValueError("Failed to decode image")
-
-        # Search for user's registered face in Discord channel
-        async for message in channel.history(limit=None):
-            if message.content.startswith(f"JARVIS_USER_ID: {username}"):
-                if message.attachments:
-                    # Get the first attachment
-                    attachment = message.attachments[0]
-                    # Download the image
-                    img_data = await attachment.read()
-                    nparr = np.frombuffer(img_data, np.uint8)
-                    registered_face = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    
-                    # Verify face using DeepFace
-                    result = DeepFace.verify(
-                        img1_path=current_img,
-                        img2_path=registered_face,
-                        model_name="VGG-Face",
-                        enforce_detection=False
-                    )
-                    
-                    if result["verified"]:
-                        return {
-                            "success": True,
-                            "user_id": str(message.id)
-                        }
-                    break
+        entry = await get_face_embedding(username)
+        if entry is None:
+            return {
+                "success": False,
+                "user_id": None
+            }
+
+        # One forward pass for the candidate, compared against the cached embedding
+        message_id, registered = entry
+        similarity = float(np.dot(await embed_image_async(face_image), registered))
+        if similarity >= MATCH_THRESHOLD:
+            return {
+                "success": True,
+                "user_id": str(message_id)
+            }
 
         return {
             "success": False,
@@ -1,15 +1,25 @@
 import aiohttp
 import asyncio
-import base64
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module
+except ImportError:
+    import base64
 from datetime import datetime
 import logging
 import json
+import os
 import uuid
+import atexit
 import cv2
 import numpy as np
 from io import BytesIO
 from PIL import Image
 
+try:
+    import uvloop  # Optional: libuv event loop, not available on Windows
+except ImportError:
+    uvloop = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,12 +27,27 @@ logger = logging.getLogger(__name__)
 # Server URL
 BASE_URL = "http://127.0.0.1:8000"
 
+# Captured faces are sent as JPEG, no larger than VGA: plenty for face auth
+JPEG_QUALITY = 85
+CAPTURE_MAX_SIZE = (640, 480)
+# The preview only decodes every Nth grabbed frame
+PREVIEW_EVERY = 2
+# Key polling interval of the preview window; grab() already paces the loop at the camera rate
+PREVIEW_POLL_MS = int(os.getenv("JARVIS_PREVIEW_MS", "10"))
+# Without a display there is no preview or 'q' key: capture once auto-exposure has settled
+HEADLESS = os.getenv("JARVIS_HEADLESS") == "1"
+HEADLESS_WARMUP_FRAMES = 15
+
+async def ainput(prompt: str = "") -> str:
+    """input() on a worker thread, so waiting for the user doesn't block the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
+
 async def get_token(session):
     """Get authentication token"""
     print("\n=== User Registration ===")
-    username = input("Enter username: ")
-    email = input("Enter email: ")
-    password = input("Enter password: ")
+    username = await ainput("Enter username: ")
+    email = await ainput("Enter email: ")
+    password = await ainput("Enter password: ")
     
     url = f"{BASE_URL}/token"
     data = {
@@ -44,9 +69,9 @@ async def get_token(session):
 async def register_user(session, auth_type="traditional"):
     """Register a new user"""
     print("\n=== User Registration ===")
-    username = input("Enter username: ")
-    email = input("Enter email: ")
-    password = input("Enter password: ")  # Always ask for password
+    username = await ainput("Enter username: ")
+    email = await ainput("Enter email: ")
+    password = await ainput("Enter password: ")  # Always ask for password
     
     data = {
         "username": username,
@@ -56,10 +81,10 @@ async def register_user(session, auth_type="traditional"):
     
     if auth_type == "face_auth":
         print("\nInitializing camera for face registration... (Press 'q' to capture)")
-        face_image = await capture_face_image()
-        if not face_image:
+        face_jpeg = await capture_face_image()
+        if not face_jpeg:
             return None, None
-        data["face_image"] = face_image
+        data["face_image"] = to_data_uri(face_jpeg)
     
     url = f"{BASE_URL}/token"
     
@@ -83,26 +108,26 @@ async def login_user(session, auth_type="traditional"):
     
     try:
         if auth_type == "traditional":
-            identifier = input("Enter username or email: ")
-            password = input("Enter password: ")
+            identifier = await ainput("Enter username or email: ")
+            password = await ainput("Enter password: ")
             url = f"{BASE_URL}/login"
             data = {
                 "identifier": identifier,
                 "password": password
             }
         else:  # face_auth
-            username = input("Enter username: ")
-            password = input("Enter password: ")  # Always ask for password
+            username = await ainput("Enter username: ")
+            password = await ainput("Enter password: ")  # Always ask for password
             print("\nInitializing camera for face verification... (Press 'q' to capture)")
-            face_image = await capture_face_image()
-            if not face_image:
+            face_jpeg = await capture_face_image()
+            if not face_jpeg:
                 return None, None
                 
             url = f"{BASE_URL}/login"
             data = {
                 "identifier": username,
                 "password": password,
-                "face_image": face_image
+                "face_image": to_data_uri(face_jpeg)
             }
         
         async with session.post(url, json=data) as response:
@@ -120,47 +145,99 @@ async def login_user(session, auth_type="traditional"):
         print(f"\n❌ Login error: {str(e)}")
         return None, None
 
+def to_data_uri(jpeg: bytes) -> str:
+    """Wrap JPEG bytes in a base64 data URI for the JSON endpoints"""
+    # Prefix the encoded bytes and decode once, rather than decoding and then copying into an f-string
+    return (b"data:image/jpeg;base64," + base64.b64encode(jpeg)).decode('ascii')
+
+# One webcam handle for the whole run: opening it costs hundreds of ms and restarts
+# auto-exposure, so it is opened on first capture and released at exit
+camera = None
+
+def get_camera():
+    global camera
+    if camera is None:
+        cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # Keep the driver queue short so the captured frame is the current one
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_MAX_SIZE[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_MAX_SIZE[1])
+        camera = cap
+    return camera
+
+@atexit.register
+def release_camera():
+    global camera
+    if camera is not None:
+        camera.release()
+        camera = None
+
 async def capture_face_image():
-    """Capture face image from camera"""
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+    """Capture face image from camera
+    Returns:
+        JPEG bytes, or None if capturing failed
+    """
+    cap = get_camera()
+    if cap is None:
         print("❌ Could not open webcam")
         return None
     
     try:
+        frame_index = 0
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            # grab() only dequeues; frames are decoded by retrieve() when actually needed
+            if not cap.grab():
                 print("❌ Could not capture frame")
                 return None
             
+            frame_index += 1
+            if HEADLESS:
+                if frame_index >= HEADLESS_WARMUP_FRAMES:
+                    break
+                continue
+            
             # Show preview
-            cv2.imshow('Camera Preview (Press q to capture)', frame)
+            if frame_index % PREVIEW_EVERY == 1:
+                ret, preview = cap.retrieve()
+                if ret:
+                    cv2.imshow('Camera Preview (Press q to capture)', preview)
             
             # Wait for 'q' key
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if cv2.waitKey(PREVIEW_POLL_MS) & 0xFF == ord('q'):
                 break
         
+        # Decode the freshest grabbed frame for upload
+        ret, frame = cap.retrieve()
+        if not ret:
+            print("❌ Could not capture frame")
+            return None
+        
         try:
-            # Convert frame to base64
-            success, buffer = cv2.imencode('.png', frame)
+            height, width = frame.shape[:2]
+            max_width, max_height = CAPTURE_MAX_SIZE
+            if width > max_width or height > max_height:
+                scale = min(max_width / width, max_height / height)
+                frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+            success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
             if not success:
-                print("❌ Failed to encode image to PNG")
+                print("❌ Failed to encode image to JPEG")
                 return None
-                
-            base64_image = base64.b64encode(buffer).decode('utf-8')
-            return f"data:image/png;base64,{base64_image}"
+            return buffer.tobytes()
             
         except Exception as e:
-            print(f"❌ Failed to convert image to base64: {str(e)}")
+            print(f"❌ Failed to encode image: {str(e)}")
             return None
             
     except Exception as e:
         print(f"\n❌ Exception while capturing image: {str(e)}")
         return None
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        if not HEADLESS:
+            cv2.destroyAllWindows()
 
 async def test_logs(session, token):
     """Test logging endpoint"""
@@ -168,28 +245,33 @@ async def test_logs(session, token):
     print("Enter log details:")
     
     log_levels = ["INFO", "WARNING", "ERROR"]
+    log_entries = []
     for level in log_levels:
-        message = input(f"Enter a {level} level message (or press Enter to skip): ")
+        message = await ainput(f"Enter a {level} level message (or press Enter to skip): ")
         if message:
-            log_entry = {
+            log_entries.append({
                 "level": level,
                 "message": message,
                 "source": "test_script"
-            }
-            
-            url = f"{BASE_URL}/logs"
-            headers = {"Authorization": f"Bearer {token}"}
-            
-            async with session.post(url, json=log_entry, headers=headers) as response:
-                if response.status == 200:
-                    print(f"✅ Successfully sent {level} log")
-                else:
-                    print(f"❌ Failed to send {level} log: {await response.text()}")
+            })
+    
+    url = f"{BASE_URL}/logs"
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    async def send_log(log_entry):
+        async with session.post(url, json=log_entry, headers=headers) as response:
+            if response.status == 200:
+                print(f"✅ Successfully sent {log_entry['level']} log")
+            else:
+                print(f"❌ Failed to send {log_entry['level']} log: {await response.text()}")
+    
+    # The entries are independent, send them concurrently
+    await asyncio.gather(*(send_log(log_entry) for log_entry in log_entries))
 
 async def test_errors(session, token):
     """Test error logging endpoint"""
     print("\n=== Testing Error Logging ===")
-    error_message = input("Enter an error message (or press Enter to skip): ")
+    error_message = await ainput("Enter an error message (or press Enter to skip): ")
     
     if error_message:
         error_entry = {
@@ -211,12 +293,12 @@ async def test_errors(session, token):
 async def test_projects(session, token, jarvis_user_id):
     """Test project creation endpoint"""
     print("\n=== Testing Project Creation ===")
-    create_project = input("Would you like to create a project? (y/n): ").lower()
+    create_project = (await ainput("Would you like to create a project? (y/n): ")).lower()
     
     if create_project == 'y':
-        project_name = input("Enter project name: ")
-        description = input("Enter project description: ")
-        status = input("Enter project status (active/pending/completed): ")
+        project_name = await ainput("Enter project name: ")
+        description = await ainput("Enter project description: ")
+        status = await ainput("Enter project status (active/pending/completed): ")
         
         project = {
             "name": project_name,
@@ -247,24 +329,17 @@ async def test_projects(session, token, jarvis_user_id):
 async def test_face_auth(session, token):
     """Test face authentication endpoint"""
     print("\n=== Testing Face Authentication ===")
-    use_camera = input("Would you like to test face authentication using your camera? (y/n): ").lower()
+    use_camera = (await ainput("Would you like to test face authentication using your camera? (y/n): ")).lower()
     
     if use_camera == 'y':
         print("\nInitializing camera... (Press 'q' to capture)")
-        face_image = await capture_face_image()
-        if not face_image:
+        face_jpeg = await capture_face_image()
+        if not face_jpeg:
             return None
         
-        url = f"{BASE_URL}/face-auth"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "user_id": "test_user_id",
-            "image_data": face_image
-        }
+        # Raw JPEG as multipart, no base64 on either side
+        url = f"{BASE_URL}/face-auth/upload"
+        headers = {"Authorization": f"Bearer {token}"}
         
         # Add retry logic
         max_retries = 3
@@ -273,7 +348,11 @@ async def test_face_auth(session, token):
         for attempt in range(max_retries):
             try:
                 timeout = aiohttp.ClientTimeout(total=30)  # 30 seconds timeout
-                async with session.post(url, json=data, headers=headers, timeout=timeout) as response:
+                # FormData can only be sent once, build it per attempt
+                data = aiohttp.FormData()
+                data.add_field("user_id", "test_user_id")
+                data.add_field("file", face_jpeg, filename="face.jpg", content_type="image/jpeg")
+                async with session.post(url, data=data, headers=headers, timeout=timeout) as response:
                     if response.status == 200:
                         result = await response.json()
                         print(f"\n✅ Successfully sent face auth")
@@ -310,15 +389,15 @@ async def main():
         sock_read=10   # Socket read timeout
     )
     
-    # Create session with timeout
-    connector = aiohttp.TCPConnector(force_close=True)
+    # One session for the whole run; its pool keeps connections to the server alive between calls
+    connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=30, enable_cleanup_closed=True)
     async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
         try:
             # Authentication choice
             print("\n=== Authentication ===")
             print("1. Register new user")
             print("2. Login existing user")
-            auth_choice = input("\nEnter your choice (1-2): ")
+            auth_choice = await ainput("\nEnter your choice (1-2): ")
             
             if auth_choice not in ['1', '2']:
                 print("❌ Invalid choice")
@@ -328,7 +407,7 @@ async def main():
             print("\n=== Authentication Method ===")
             print("1. Traditional (username/password)")
             print("2. Face Authentication")
-            method_choice = input("\nEnter your choice (1-2): ")
+            method_choice = await ainput("\nEnter your choice (1-2): ")
             
             if method_choice not in ['1', '2']:
                 print("❌ Invalid choice")
@@ -355,7 +434,7 @@ async def main():
                 print("4. Test Face Authentication")
                 print("5. Exit")
                 
-                choice = input("\nEnter your choice (1-5): ")
+                choice = await ainput("\nEnter your choice (1-5): ")
                 
                 if choice == '1':
                     await test_logs(session, token)
@@ -375,4 +454,6 @@ async def main():
             print(f"\n❌ Test failed: {str(e)}")
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main()) 
\ No newline at end of file
@@ -1,12 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, List, Optional, Set
-from datetime import datetime, timedelta
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
 import uvicorn
 from dotenv import load_dotenv
 import os
+import time
+import heapq
 import logging
+import orjson
+import msgspec
 from collections import deque
 from dns_server import JarvisDNSServer, ServiceRecord
 
@@ -16,7 +21,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Service Monitor")
+app = FastAPI(title="Service Monitor", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -34,18 +39,51 @@ class InstanceStatus(BaseModel):
     port: Optional[int]
     busy: Optional[bool] = False
     last_ping: datetime
+    # Same instant as last_ping in epoch ns, compared by the sweeps without datetime arithmetic
+    last_ping_ns: int = Field(0, exclude=True)
     registered_at: datetime
     metadata: Dict = {}
     tags: Set[str] = set()
     error_count: int = 0
     last_error: Optional[str] = None
 
-# Store instance history (last 100 status changes per instance)
+# Instances silent for longer than these are reported dead / removed
+DEAD_AFTER_NS = 5 * 60 * 10**9
+CLEANUP_AFTER_NS = 30 * 60 * 10**9
+
+# Store instance history (last HISTORY_LENGTH status changes per instance) as
+# (timestamp, old_status, new_status) tuples in a fixed-size ring; dicts are only built on read
+HISTORY_LENGTH = 100
 history: Dict[str, Dict[int, deque]] = {}
 
 # Store for all instances across different servers
 instances: Dict[str, Dict[int, InstanceStatus]] = {}
 
+# Min-heap of (last_ping_ns, server, instance_id) so cleanup only visits expired instances.
+# Entries go stale when an instance pings again; they are skipped when popped, and the heap
+# is rebuilt from the live instances once stale entries outnumber them PING_HEAP_SLACK to 1
+ping_heap: List[Tuple[int, str, int]] = []
+PING_HEAP_SLACK = 4
+
+# Serialized GET /status body, rebuilt only when the registry version has moved on.
+# The ETag carries a per-process prefix so a restart never matches a client's old tag
+status_cache = {"version": 0, "built": -1, "etag": "", "body": b""}
+STATUS_ETAG_PREFIX = format(time.time_ns(), "x")
+
+def bump_status_version():
+    status_cache["version"] += 1
+
+def record_ping(server: str, instance_id: int, ping_ns: int):
+    heapq.heappush(ping_heap, (ping_ns, server, instance_id))
+    live = sum(len(server_instances) for server_instances in instances.values())
+    if len(ping_heap) > PING_HEAP_SLACK * live + 64:
+        ping_heap[:] = [
+            (instance.last_ping_ns, server, instance_id)
+            for server, server_instances in instances.items()
+            for instance_id, instance in server_instances.items()
+        ]
+        heapq.heapify(ping_heap)
+
 class RegisterRequest(BaseModel):
     server: str
     instance_id: int
@@ -53,13 +91,22 @@ class RegisterRequest(BaseModel):
     metadata: Optional[Dict] = {}
     tags: Optional[Set[str]] = set()
 
-class StatusUpdate(BaseModel):
+# Heartbeat body, decoded and validated straight from bytes by msgspec (the hottest endpoint)
+class StatusUpdate(msgspec.Struct):
     server: str
     instance_id: int
     status: str
     busy: Optional[bool] = False
     error: Optional[str] = None
 
+status_update_decoder = msgspec.json.Decoder(StatusUpdate)
+
+async def parse_status_update(request: Request) -> StatusUpdate:
+    try:
+        return status_update_decoder.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 class ServiceRegistration(BaseModel):
     service_type: str
     ip: str
@@ -80,20 +127,25 @@ async def register_instance(request: RegisterRequest):
             instances[request.server] = {}
             history[request.server] = {}
         
+        now = datetime.now()
+        now_ns = time.time_ns()
         instances[request.server][request.instance_id] = InstanceStatus(
             server=request.server,
             instance_id=request.instance_id,
             status="active",
             port=request.port,
             busy=False,
-            last_ping=datetime.now(),
-            registered_at=datetime.now(),
+            last_ping=now,
+            last_ping_ns=now_ns,
+            registered_at=now,
             metadata=request.metadata,
             tags=request.tags
         )
         
         # Initialize history
-        history[request.server][request.instance_id] = deque(maxlen=100)
+        history[request.server][request.instance_id] = deque(maxlen=HISTORY_LENGTH)
+        record_ping(request.server, request.instance_id, now_ns)
+        bump_status_version()
         logger.info(f"Registered new instance: {request.server}:{request.instance_id}")
         return {"status": "registered"}
     except Exception as e:
@@ -101,7 +153,7 @@ async def register_instance(request: RegisterRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/status")
-async def update_status(update: StatusUpdate):
+async def update_status(update: StatusUpdate = Depends(parse_status_update)):
     try:
         if update.server not in instances or update.instance_id not in instances[update.server]:
             raise HTTPException(status_code=404, detail="Instance not found")
@@ -112,7 +164,11 @@ async def update_status(update: StatusUpdate):
         # Update instance
         instance.status = update.status
         instance.busy = update.busy
-        instance.last_ping = datetime.now()
+        now = datetime.now()
+        instance.last_ping = now
+        instance.last_ping_ns = time.time_ns()
+        record_ping(update.server, update.instance_id, instance.last_ping_ns)
+        bump_status_version()
         
         # Handle error reporting
         if update.error:
@@ -121,11 +177,7 @@ async def update_status(update: StatusUpdate):
         
         # Record status change in history
         if old_status != update.status:
-            history[update.server][update.instance_id].append({
-                "timestamp": datetime.now(),
-                "old_status": old_status,
-                "new_status": update.status
-            })
+            history[update.server][update.instance_id].append((now, old_status, update.status))
         
         return {"status": "updated"}
     except HTTPException:
@@ -140,7 +192,10 @@ async def get_instance_history(server: str, instance_id: int):
         instance_id not in history[server]):
         raise HTTPException(status_code=404, detail="Instance history not found")
     
-    return list(history[server][instance_id])
+    return [
+        {"timestamp": timestamp, "old_status": old_status, "new_status": new_status}
+        for timestamp, old_status, new_status in history[server][instance_id]
+    ]
 
 @app.get("/status/{server}")
 async def get_server_status(server: str):
@@ -153,49 +208,70 @@ async def get_server_status(server: str):
     }
 
 @app.get("/status")
-async def get_all_status():
-    return instances
+async def get_all_status(request: Request):
+    if status_cache["built"] != status_cache["version"]:
+        status_cache["body"] = orjson.dumps(
+            {
+                server: {instance_id: instance.model_dump(mode="json") for instance_id, instance in server_instances.items()}
+                for server, server_instances in instances.items()
+            },
+            option=orjson.OPT_NON_STR_KEYS,
+        )
+        status_cache["etag"] = f'"{STATUS_ETAG_PREFIX}-{status_cache["version"]}"'
+        status_cache["built"] = status_cache["version"]
+    
+    headers = {"ETag": status_cache["etag"]}
+    if request.headers.get("if-none-match") == status_cache["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=status_cache["body"], media_type="application/json", headers=headers)
 
 @app.get("/health")
 async def monitor_health():
-    threshold = datetime.now() - timedelta(minutes=5)
+    threshold_ns = time.time_ns() - DEAD_AFTER_NS
     error_threshold = 10
     
-    status_counts = {
-        "active": 0,
-        "dead": 0,
-        "error": 0
-    }
-    
-    for server in instances:
-        for instance_id in list(instances[server].keys()):
-            instance = instances[server][instance_id]
-            if instance.last_ping < threshold:
-                instance.status = "dead"
-                status_counts["dead"] += 1
+    # One pass over the instance records themselves, counting into locals; only dead
+    # and error need a branch, everything else is derived from the totals
+    total = dead = errored = inactive = 0
+    for server_instances in instances.values():
+        total += len(server_instances)
+        for instance in server_instances.values():
+            if instance.last_ping_ns < threshold_ns:
+                if instance.status != "dead":
+                    instance.status = "dead"
+                    bump_status_version()
+                dead += 1
             elif instance.error_count > error_threshold:
-                status_counts["error"] += 1
-            elif instance.status == "active":
-                status_counts["active"] += 1
+                errored += 1
+            elif instance.status != "active":
+                inactive += 1
     
     return {
         "total_servers": len(instances),
-        "total_instances": sum(len(server_instances) for server_instances in instances.values()),
-        "status_counts": status_counts,
+        "total_instances": total,
+        "status_counts": {
+            "active": total - dead - errored - inactive,
+            "dead": dead,
+            "error": errored
+        },
         "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/cleanup")
 async def cleanup_dead_instances():
-    threshold = datetime.now() - timedelta(minutes=30)
+    threshold_ns = time.time_ns() - CLEANUP_AFTER_NS
     cleaned = 0
     
-    for server in list(instances.keys()):
-        for instance_id in list(instances[server].keys()):
-            if instances[server][instance_id].last_ping < threshold:
-                del instances[server][instance_id]
-                del history[server][instance_id]
-                cleaned += 1
+    # Pop only the entries older than the threshold instead of scanning every instance
+    while ping_heap and ping_heap[0][0] < threshold_ns:
+        ping_ns, server, instance_id = heapq.heappop(ping_heap)
+        instance = instances.get(server, {}).get(instance_id)
+        if instance is None or instance.last_ping_ns != ping_ns:
+            continue  # Already removed, re-registered or pinged since
+        del instances[server][instance_id]
+        del history[server][instance_id]
+        cleaned += 1
+        bump_status_version()
         
         # Clean up empty servers
         if not instances[server]:
@@ -204,7 +280,7 @@ async def cleanup_dead_instances():
     
     return {"cleaned_instances": cleaned}
 
-@app.post("/register")
+@app.post("/services/register")
 async def register_service(service: ServiceRegistration):
     success = await dns_server.register_service(
         service.service_type,
@@ -230,7 +306,7 @@ async def get_service(service_type: str) -> ServiceResponse:
         health=service.health
     )
 
-@app.get("/status")
+@app.get("/services/status")
 async def get_status() -> Dict[str, List[Dict]]:
     return dns_server.get_service_status()
 
@@ -239,6 +315,7 @@ async def startup_event():
     await dns_server.run()
 
 if __name__ == "__main__":
+    # uvicorn's default loop="auto" runs on uvloop whenever it is installed
     uvicorn.run(
         app, 
         host=os.getenv("HOST", "0.0.0.0"),
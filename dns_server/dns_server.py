@@ -11,7 +11,7 @@ import dns.resolver
 import dns.zone
 import dns.update
 import dns.query
-from dataclasses import dataclass
+from dataclasses import dataclass, field, asdict
 import logging
 import socket
 
@@ -26,20 +26,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class ServiceInstance(BaseModel):
+# Internal record built from a validated ServiceRegistration, so a plain dataclass
+# is enough; pydantic stays on the request models
+@dataclass
+class ServiceInstance:
     server: str
     instance_id: int
-    host: str = "localhost"
     port: int
-    last_heartbeat: float = time.time()
+    host: str = "localhost"
+    last_heartbeat: float = field(default_factory=time.time)
     status: str = "healthy"
-    metadata: Dict = {}
-    performance_metrics: Dict = {
+    metadata: Dict = field(default_factory=dict)
+    performance_metrics: Dict = field(default_factory=lambda: {
         "cpu": 0,
         "memory": 0,
         "network": 0,
         "requests_per_second": 0
-    }
+    })
     security_status: str = "secure"
     power_level: float = 100.0  # Iron Man style power level
 
@@ -120,6 +123,11 @@ class DNSServer:
             "active_threats": 0
         }
         self._tasks = []
+        # Pooled client shared by the health probes, so recovering instances keep their
+        # connections alive between ticks instead of reconnecting for every probe
+        self._client: Optional[httpx.AsyncClient] = None
+        # Recovery probes run concurrently, at most this many in flight
+        self._probe_limit = asyncio.Semaphore(50)
 
     async def __aenter__(self):
         await self.start()
@@ -130,6 +138,11 @@ class DNSServer:
 
     async def start(self):
         """Initialize async tasks"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_keepalive_connections=100, max_connections=200, keepalive_expiry=60)
+            )
         self._tasks = [
             asyncio.create_task(self.health_check_loop()),
             asyncio.create_task(self.power_management_loop())
@@ -144,6 +157,9 @@ class DNSServer:
         if self._tasks:
             await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def register_service(self, registration: ServiceRegistration) -> ServiceInstance:
         """Register a new service instance"""
@@ -151,7 +167,7 @@ class DNSServer:
             server=registration.server,
             instance_id=registration.instance_id,
             port=registration.port,
-            metadata=registration.metadata
+            metadata=registration.metadata or {}
         )
         
         if registration.server not in self.services:
@@ -221,6 +237,7 @@ class DNSServer:
             try:
                 current_time = time.time()
                 threats_detected = 0
+                recover_targets = []
                 
                 for service_type, instances in self.services.items():
                     for instance in instances:
@@ -235,20 +252,17 @@ class DNSServer:
                             if threat.threat_level in ["high", "critical"]:
                                 instance.security_status = "compromised"
                                 
-                        # Try to recover unhealthy instances
+                        # Collect unhealthy instances for recovery
                         if instance.status == "unhealthy":
-                            try:
-                                async with httpx.AsyncClient() as client:
-                                    response = await client.get(
-                                        f"http://{instance.host}:{instance.port}/health",
-                                        timeout=5.0
-                                    )
-                                    if response.status_code == 200:
-                                        instance.status = "healthy"
-                                        instance.last_heartbeat = current_time
-                                        instance.power_level = min(100.0, instance.power_level * 1.2)
-                            except:
-                                pass
+                            recover_targets.append(instance)
+                
+                # Try to recover unhealthy instances, probing them all at once
+                results = await asyncio.gather(*(self._probe(instance) for instance in recover_targets))
+                for instance, recovered in results:
+                    if recovered:
+                        instance.status = "healthy"
+                        instance.last_heartbeat = current_time
+                        instance.power_level = min(100.0, instance.power_level * 1.2)
                 
                 # Update system status
                 self.status.update({
@@ -262,6 +276,15 @@ class DNSServer:
                 
             await asyncio.sleep(self.health_check_interval)
 
+    async def _probe(self, instance: ServiceInstance):
+        """Check an instance's /health endpoint, returning (instance, recovered)"""
+        async with self._probe_limit:
+            try:
+                response = await self._client.get(f"http://{instance.host}:{instance.port}/health")
+                return instance, response.status_code == 200
+            except Exception:
+                return instance, False
+
     async def power_management_loop(self):
         """Manage power distribution across services"""
         while True:
@@ -299,7 +322,7 @@ async def register_service(
     instance = await dns_server.register_service(registration)
     return {
         "status": "registered",
-        "instance": instance,
+        "instance": asdict(instance),
         "power_level": instance.power_level,
         "security_status": instance.security_status
     }
@@ -413,4 +436,5 @@ async def activate_defense_protocol(protocol: str, dns_server: DNSServer = Depen
 if __name__ == "__main__":
     import uvicorn
     print("Initializing JARVIS Network Control System...")
-    uvicorn.run(app, host="0.0.0.0", port=9000)
\ No newline at end of file
+    # uvicorn's default loop="auto" runs on uvloop whenever it is installed
+    uvicorn.run(app, host="0.0.0.0", port=9000, loop="auto")
\ No newline at end of file
@@ -12,6 +12,9 @@ class BaseServer:
         self.service_name = service_name
         self.dns_client = None
         self.busy = False
+        # DNS busy-status pushes are coalesced into a single in-flight task
+        self._status_task = None
+        self._pushed_busy = None
         
         # Add CORS middleware
         self.app.add_middleware(
@@ -73,8 +76,17 @@ class BaseServer:
     def set_busy(self, busy: bool):
         """Update server's busy status"""
         self.busy = busy
-        if self.dns_client:
-            asyncio.create_task(self.dns_client.update_status(busy))
+        if self.dns_client and (self._status_task is None or self._status_task.done()):
+            self._status_task = asyncio.create_task(self._push_status())
+    
+    async def _push_status(self):
+        """Push the busy status to DNS until the last pushed state matches the current one"""
+        while self.dns_client and self._pushed_busy != self.busy:
+            busy = self.busy
+            await self.dns_client.update_status(busy)
+            self._pushed_busy = busy
+            # Let rapid busy/idle flips settle before checking again
+            await asyncio.sleep(0.05)
     
     def run(self):
         """Run the server"""